@@ -0,0 +1,62 @@
+# Compares the single-pass t.me/s extractor with the BeautifulSoup path it
+# replaced, on the saved channel pages in benchmarks/fixtures.
+#
+#   python benchmarks/bench_tme_parser.py [iterations]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from tme_parser import extract_messages  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def soup_extract(content):
+    document = BeautifulSoup(content, "html.parser")
+    messages = []
+    for message in document.find_all("div", class_="tgme_widget_message"):
+        # The selector the collectors used, which skips reply quotes
+        text = message.find("div", class_="tgme_widget_message_text js-message_text")
+        links = [a.get("href") for a in text.find_all("a")] if text else []
+        codes = [code.text.strip() for code in message.find_all("code")]
+        messages.append((message.get("data-post"), links, codes))
+    return messages
+
+
+def bench(name, func, pages, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for content in pages:
+            func(content)
+    elapsed = time.perf_counter() - start
+    per_page = elapsed / (iterations * len(pages)) * 1e6
+    print(f"{name:<14} {per_page:10.1f} us/page")
+    return per_page
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    pages = []
+    for name in sorted(os.listdir(FIXTURES)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES, name), "rb") as f:
+                pages.append(f.read())
+
+    # Both paths must agree before timing means anything
+    for content in pages:
+        fast = [(m.links, m.codes) for m in extract_messages(content)]
+        slow = [(links, codes) for _, links, codes in soup_extract(content)]
+        assert fast == slow, "extractor output differs from BeautifulSoup"
+
+    size = sum(len(content) for content in pages) / len(pages) / 1024
+    print(f"{len(pages)} fixtures, {size:.1f} KiB average, {iterations} iterations")
+    slow = bench("beautifulsoup", soup_extract, pages, iterations)
+    fast = bench("tme_parser", extract_messages, pages, iterations)
+    print(f"speed-up       {slow / fast:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
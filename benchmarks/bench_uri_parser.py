@@ -0,0 +1,142 @@
+# Times uri_parser.parse on a large synthetic corpus of mixed proxy/config
+# links against the urlsplit/parse_qs based parsing it replaced, and checks
+# that both agree on every link the old code parsed completely.
+#
+#   python benchmarks/bench_uri_parser.py [links] [iterations]
+import os
+import sys
+import json
+import time
+import base64
+import random
+from urllib.parse import urlsplit, parse_qs, unquote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from uri_parser import try_parse  # noqa: E402
+
+
+def _b64(text):
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+def _b64decode(data):
+    data = data.strip().replace("-", "+").replace("_", "/")
+    return base64.b64decode(data + "=" * (-len(data) % 4)).decode("utf-8")
+
+
+def stdlib_key(link):
+    # The previous canonical_key, kept here as the baseline
+    try:
+        scheme, _, rest = link.strip().partition("://")
+        scheme = scheme.lower()
+        if scheme == "tg" or (scheme == "https" and rest.startswith("t.me/proxy")):
+            params = parse_qs(urlsplit(link).query)
+            server = params["server"][0].strip("[]").lower().rstrip(".")
+            return ("mtproto", server, int(params["port"][0]), params["secret"][0].lower())
+        if scheme == "vmess":
+            config = json.loads(_b64decode(rest.split("#")[0]))
+            host = str(config["add"]).strip("[]").lower().rstrip(".")
+            return ("vmess", host, int(config["port"]), str(config["id"]).lower())
+        if scheme == "ss":
+            userinfo, address = rest.split("#")[0].rsplit("@", 1)
+            userinfo = unquote(userinfo)
+            if ":" not in userinfo:
+                userinfo = _b64decode(userinfo)
+            parts = urlsplit("//" + address.split("?")[0].split("/")[0])
+            return ("ss", parts.hostname.rstrip("."), parts.port, userinfo)
+        if scheme in ("vless", "trojan"):
+            parts = urlsplit(link)
+            credential = unquote(parts.username)
+            if scheme == "vless":
+                credential = credential.lower()
+            return (scheme, parts.hostname.rstrip("."), parts.port, credential)
+    except Exception:
+        pass
+    return None
+
+
+def make_corpus(size, seed=1):
+    rng = random.Random(seed)
+
+    def host():
+        roll = rng.random()
+        if roll < 0.6:
+            return ".".join(str(rng.randrange(1, 255)) for _ in range(4))
+        if roll < 0.9:
+            return f"node{rng.randrange(10000)}.example.com"
+        return f"[2001:db8::{rng.randrange(65535):x}]"
+
+    def uuid():
+        return "%08x-%04x-%04x-%04x-%012x" % tuple(rng.getrandbits(b) for b in (32, 16, 16, 16, 48))
+
+    def link():
+        kind = rng.randrange(7)
+        port = rng.choice((443, 8443, 80, 2053, rng.randrange(1, 65536)))
+        if kind == 0:
+            return f"tg://proxy?server={host().strip('[]')}&port={port}&secret=ee{rng.getrandbits(128):032x}"
+        if kind == 1:
+            return f"https://t.me/proxy?server={host().strip('[]')}&port={port}&secret={rng.getrandbits(128):032x}"
+        if kind == 2:
+            return f"vless://{uuid()}@{host()}:{port}?encryption=none&security=reality&type=grpc#remark-{rng.randrange(999)}"
+        if kind == 3:
+            config = {"v": "2", "ps": "remark", "add": host().strip("[]"), "port": str(port), "id": uuid(), "net": "ws"}
+            return "vmess://" + base64.b64encode(json.dumps(config).encode()).decode()
+        if kind == 4:
+            return f"ss://{_b64('chacha20-ietf-poly1305:' + uuid())}@{host()}:{port}#ss-{rng.randrange(99)}"
+        if kind == 5:
+            return f"trojan://{uuid()}@{host()}:{port}?sni=example.com&type=tcp#trojan"
+        # Malformed: truncated, missing port or junk
+        return rng.choice((
+            f"vless://{uuid()}@{host()}",
+            f"tg://proxy?server={host()}&port=&secret=ab",
+            "vmess://not-base64!!",
+            f"trojan://@{host()}:{port}",
+            "https://example.com/not/a/proxy",
+        ))
+
+    return [link() for _ in range(size)]
+
+
+def bench(name, func, corpus, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for link in corpus:
+            func(link)
+    elapsed = time.perf_counter() - start
+    per_link = elapsed / (iterations * len(corpus)) * 1e6
+    print(f"{name:<14} {per_link:10.2f} us/link")
+    return per_link
+
+
+def new_key(link):
+    endpoint = try_parse(link)
+    return endpoint.key() if endpoint is not None else None
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    corpus = make_corpus(size)
+
+    accepted = rejected = 0
+    for link in corpus:
+        key = new_key(link)
+        baseline = stdlib_key(link)
+        # The old code accepted links without a port or credential; those
+        # are now rejected
+        if baseline is not None and baseline[2] is not None and baseline[3]:
+            assert key == baseline, f"parsers disagree on {link!r}: {key} != {baseline}"
+        if key is None:
+            rejected += 1
+        else:
+            accepted += 1
+
+    print(f"{size} links ({accepted} valid, {rejected} rejected), {iterations} iterations")
+    slow = bench("urlsplit", stdlib_key, corpus, iterations)
+    fast = bench("uri_parser", new_key, corpus, iterations)
+    print(f"speed-up       {slow / fast:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
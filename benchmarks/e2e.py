@@ -0,0 +1,270 @@
+# Offline end-to-end benchmark of the collection and serving pipeline.
+#
+# Every external service is replaced by a local fake (see fakes.py): t.me
+# pages are replayed from fixtures, proxy endpoints are local TCP listeners,
+# Supabase is a minimal PostgREST and Telegram is a fake Bot API. Each stage
+# reports throughput, p50/p99 latency and peak traced memory.
+#
+#   python benchmarks/e2e.py                  # all channels in setting.json
+#   python benchmarks/e2e.py --channels 200 --groups 20
+import os
+import sys
+import json
+import time
+import argparse
+import shutil
+import tempfile
+import tracemalloc
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import TmeReplayServer, FakePostgrest, FakeTelegram, TcpEndpoints  # noqa: E402
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Stage:
+    def __init__(self, name, results):
+        self.name = name
+        self.results = results
+        self.latencies = []
+        self.items = 0
+
+    def __enter__(self):
+        tracemalloc.reset_peak()
+        self.base = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        peak = tracemalloc.get_traced_memory()[1] - self.base
+        self.results.append({
+            "stage": self.name,
+            "items": self.items,
+            "seconds": elapsed,
+            "throughput": self.items / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(self.latencies, 0.50) * 1000,
+            "p99_ms": percentile(self.latencies, 0.99) * 1000,
+            "peak_mib": max(peak, 0) / 1024 / 1024,
+        })
+
+
+def timed(func, latencies):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper
+
+
+def endpoint_link(link, endpoints):
+    # Points a collected link at one of the local listeners, chosen by hash so
+    # duplicates of the same link hit the same endpoint
+    kind, host, port = endpoints[zlib.crc32(link.encode()) % len(endpoints)]
+    return f"vless://{zlib.crc32(link.encode()):08x}@{host}:{port}?type=tcp"
+
+
+def configure_env(workdir, tme, postgrest, telegram, groups):
+    os.environ.update({
+        "TME_BASE_URL": tme.url + "/s/",
+        "URL": postgrest.url,
+        "KEY": "benchmark",
+        "BOT_TOKEN": "123456:benchmark",
+        "GROUP_CHAT_ID": ",".join(str(-1000 - i) for i in range(groups)),
+        "ADMIN_IDS": "1",
+        "CURSOR_FILE": os.path.join(workdir, "cursors.json"),
+        "DEDUP_DIR": workdir,
+        "PROBE_CACHE_FILE": os.path.join(workdir, "probe_cache.json"),
+        "CACHE_TTL": "60",
+    })
+
+
+def run(args):
+    results = []
+    workdir = tempfile.mkdtemp(prefix="tgprox-bench-")
+    with open(os.path.join(ROOT, "setting.json"), encoding="utf-8") as f:
+        settings = json.load(f)
+    channels = settings["config_channels"][:args.channels]
+    proxy_channels = settings["proxy_channels"]
+
+    with TmeReplayServer(latency=args.fetch_latency) as tme, \
+            FakePostgrest(latency=args.db_latency) as postgrest, \
+            FakeTelegram(latency=args.telegram_latency, flood_every=args.flood_every) as telegram, \
+            TcpEndpoints(args.ok, args.refused, args.blackhole, args.accept_delay) as tcp:
+        configure_env(workdir, tme, postgrest, telegram, args.groups)
+        # Runtime state (cursors, dedup index, logs) stays in the temp dir
+        shutil.copy(os.path.join(ROOT, "setting.json"), workdir)
+        os.chdir(workdir)
+        tracemalloc.start()
+
+        import fetcher
+        import supabase_db
+        import config_collector
+        import proxy_collector
+        from crawler import crawl
+        from cursor_store import CursorStore
+        from pinger import ping_many
+        import telebot  # type: ignore
+
+        telebot.apihelper.API_URL = telegram.api_url
+
+        fetch_latencies = []
+        fetcher.fetch_response = timed(fetcher.fetch_response, fetch_latencies)
+        cursors = CursorStore()
+
+        with Stage("crawl+parse (cold)", results) as stage:
+            collected = []
+            for _, items in crawl(channels, config_collector.parse_page, cursors):
+                collected.extend(items)
+            stage.items = len(channels)
+            stage.latencies = list(fetch_latencies)
+
+        fetch_latencies.clear()
+        with Stage("crawl+parse (cursor)", results) as stage:
+            for _ in crawl(channels, config_collector.parse_page, cursors):
+                pass
+            stage.items = len(channels)
+            stage.latencies = list(fetch_latencies)
+
+        proxies = []
+        for _, items in crawl(proxy_channels, proxy_collector.parse_page):
+            proxies.extend(items)
+
+        with Stage("dedup", results) as stage:
+            from canonical import DedupIndex
+            unique = DedupIndex("bench").dedupe(collected)
+            stage.items = len(collected)
+
+        endpoints = tcp.all()
+        # Replayed channels repeat the same configs, so every collected link
+        # (not just the unique ones) becomes its own probe target
+        links = [endpoint_link(f"{i}:{link}", endpoints) for i, link in enumerate(collected)]
+        with Stage("probe", results) as stage:
+            alive = {}
+            for link, rtt in ping_many(links, timeout=args.probe_timeout):
+                if rtt is not None:
+                    alive[link] = rtt
+                    stage.latencies.append(rtt / 1000)
+            stage.items = len(links)
+
+        # The client is created lazily; keep its import cost out of the timings
+        supabase_db.get_client()
+        from probe_cache import ProbeCache
+
+        # Links share the local endpoints, so the cold run merges duplicate
+        # attempts and the warm run is answered from the cache
+        probe_cache = ProbeCache(os.path.join(workdir, "probe_cache.json"))
+        for name in ("probe+cache (cold)", "probe+cache (warm)"):
+            with Stage(name, results) as stage:
+                for link, rtt in ping_many(links, timeout=args.probe_timeout, cache=probe_cache):
+                    if rtt is not None:
+                        stage.latencies.append(rtt / 1000)
+                stage.items = len(links)
+
+        rows = [{"config": link, "latency_ms": round(rtt)} for link, rtt in alive.items()]
+        rows += [{"config": link} for link in unique[: args.rows]]
+        with Stage("store", results) as stage:
+            chunk = supabase_db.UPSERT_CHUNK_SIZE
+            for start in range(0, len(rows), chunk):
+                began = time.perf_counter()
+                supabase_db.upsert_configs(rows[start:start + chunk])
+                stage.latencies.append(time.perf_counter() - began)
+            supabase_db.upsert_proxies([{"url": url, "latency_ms": 50} for url in proxies])
+            stage.items = len(rows) + len(proxies)
+
+        import bot
+
+        with Stage("get_proxies (cached)", results) as stage:
+            for _ in range(args.requests):
+                began = time.perf_counter()
+                bot.get_proxies(10)
+                stage.latencies.append(time.perf_counter() - began)
+            stage.items = args.requests
+
+        import web_app
+
+        client = web_app.app.test_client()
+        headers = {"Accept-Encoding": "gzip, br"}
+        with Stage("/api/proxies (304)", results) as stage:
+            etag = client.get("/api/proxies", headers=headers).headers["ETag"]
+            for _ in range(args.requests):
+                began = time.perf_counter()
+                client.get("/api/proxies", headers=dict(headers, **{"If-None-Match": etag}))
+                stage.latencies.append(time.perf_counter() - began)
+            stage.items = args.requests
+
+        message = telebot.types.Message.de_json({
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": 42, "type": "private"},
+            "from": {"id": 42, "is_bot": False, "first_name": "bench"},
+            "text": "/getproxy",
+        })
+        with Stage("/getproxy handler", results) as stage:
+            for _ in range(args.requests // 10):
+                began = time.perf_counter()
+                bot.get_proxy_command(message)
+                stage.latencies.append(time.perf_counter() - began)
+            stage.items = args.requests // 10
+
+        send_latencies = []
+        bot.bot.send_message = timed(bot.bot.send_message, send_latencies)
+        with Stage("broadcast", results) as stage:
+            bot.send_updates()
+            stage.items = len(bot.GROUP_CHAT_IDS)
+            stage.latencies = send_latencies
+
+        tracemalloc.stop()
+    return results
+
+
+def report(results):
+    header = f"{'stage':<22}{'items':>8}{'sec':>9}{'items/s':>11}{'p50 ms':>10}{'p99 ms':>10}{'peak MiB':>10}"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        print(
+            f"{row['stage']:<22}{row['items']:>8}{row['seconds']:>9.2f}"
+            f"{row['throughput']:>11.1f}{row['p50_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+            f"{row['peak_mib']:>10.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--channels", type=int, default=None, help="config channels to crawl (default: all)")
+    parser.add_argument("--groups", type=int, default=60, help="group chats to broadcast to")
+    parser.add_argument("--requests", type=int, default=1000, help="serving requests to time")
+    parser.add_argument("--rows", type=int, default=2000, help="extra rows to store")
+    parser.add_argument("--ok", type=int, default=20, help="accepting TCP endpoints")
+    parser.add_argument("--refused", type=int, default=10, help="refusing TCP endpoints")
+    parser.add_argument("--blackhole", type=int, default=5, help="dropping TCP endpoints")
+    parser.add_argument("--accept-delay", type=float, default=0.0)
+    parser.add_argument("--probe-timeout", type=float, default=1.0)
+    parser.add_argument("--fetch-latency", type=float, default=0.0, help="seconds added to each page")
+    parser.add_argument("--db-latency", type=float, default=0.0)
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--flood-every", type=int, default=None, help="answer every Nth Bot API call with 429")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# Local stand-ins for every external service the pipeline talks to, so the
+# benchmarks run with no network access.
+import os
+import json
+import time
+import socket
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+
+class _Server:
+    handler = None
+
+    def __init__(self, **options):
+        handler = type("Handler", (self.handler,), {"fake": self})
+        self.options = options
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _TmeHandler(_QuietHandler):
+    def do_GET(self):
+        fake = self.fake
+        parts = urlsplit(self.path)
+        channel = parts.path.rsplit("/", 1)[-1]
+        time.sleep(fake.options.get("latency", 0))
+        page = fake.page_for(channel)
+        etag = '"' + hashlib.md5(page).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_body(304, headers={"ETag": etag})
+            return
+        if "after" in parse_qs(parts.query):
+            # Replayed pages never grow, so there is nothing after the cursor
+            page = b"<html><body></body></html>"
+        self.send_body(200, page, "text/html; charset=utf-8", {"ETag": etag})
+
+
+class TmeReplayServer(_Server):
+    # Serves /s/<channel> by replaying the recorded fixture pages, with the
+    # channel name substituted so every channel gets its own page
+    handler = _TmeHandler
+
+    def __init__(self, latency=0):
+        super().__init__(latency=latency)
+        self.pages = []
+        for name in sorted(os.listdir(FIXTURES)):
+            if name.endswith(".html"):
+                with open(os.path.join(FIXTURES, name), "rb") as f:
+                    page = f.read()
+                self.pages.append((page, _fixture_channel(page)))
+
+    def page_for(self, channel):
+        index = int(hashlib.md5(channel.encode()).hexdigest(), 16) % len(self.pages)
+        page, recorded = self.pages[index]
+        return page.replace(recorded, channel.encode())
+
+
+def _fixture_channel(page):
+    start = page.index(b'data-post="') + len(b'data-post="')
+    return page[start:page.index(b"/", start)]
+
+
+class _PostgrestHandler(_QuietHandler):
+    def _table(self):
+        parts = urlsplit(self.path)
+        return parts.path.rsplit("/", 1)[-1], parse_qs(parts.query)
+
+    def do_GET(self):
+        table, query = self._table()
+        time.sleep(self.fake.options.get("latency", 0))
+        rows = list(self.fake.tables.get(table, {}).values())
+        limit = int(query.get("limit", [len(rows)])[0])
+        self.send_body(200, json.dumps(rows[:limit]).encode())
+
+    def do_POST(self):
+        table, _ = self._table()
+        time.sleep(self.fake.options.get("latency", 0))
+        rows = self.read_json()
+        rows = rows if isinstance(rows, list) else [rows]
+        with self.fake.lock:
+            stored = self.fake.tables.setdefault(table, {})
+            for row in rows:
+                key = row.get("endpoint_key") or row.get("url") or len(stored)
+                stored[key] = dict(stored.get(key, {}), **row)
+            self.fake.requests += 1
+        self.send_body(201)
+
+    def do_PATCH(self):
+        self.do_POST()
+
+    def do_DELETE(self):
+        time.sleep(self.fake.options.get("latency", 0))
+        with self.fake.lock:
+            self.fake.requests += 1
+        self.send_body(204)
+
+
+class FakePostgrest(_Server):
+    # Minimal PostgREST under /rest/v1: upserts by endpoint_key, selects with
+    # limit, accepts deletes. Filters and ordering are not evaluated.
+    handler = _PostgrestHandler
+
+    def __init__(self, latency=0):
+        super().__init__(latency=latency)
+        self.tables = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+
+
+class _TelegramHandler(_QuietHandler):
+    def do_POST(self):
+        fake = self.fake
+        method = self.path.rsplit("/", 1)[-1]
+        time.sleep(fake.options.get("latency", 0))
+        with fake.lock:
+            fake.calls[method] = fake.calls.get(method, 0) + 1
+            count = fake.calls[method]
+        every = fake.options.get("flood_every")
+        if every and count % every == 0:
+            body = {
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            }
+            self.send_body(429, json.dumps(body).encode())
+            return
+        result = {
+            "message_id": count,
+            "date": int(time.time()),
+            "chat": {"id": 1, "type": "private"},
+            "text": "",
+        }
+        self.send_body(200, json.dumps({"ok": True, "result": result}).encode())
+
+    do_GET = do_POST
+
+
+class FakeTelegram(_Server):
+    # Bot API stand-in: every method succeeds with a message-like result;
+    # flood_every=N answers every Nth call with 429 retry_after=1
+    handler = _TelegramHandler
+
+    def __init__(self, latency=0, flood_every=None):
+        super().__init__(latency=latency, flood_every=flood_every)
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    @property
+    def api_url(self):
+        return self.url + "/bot{0}/{1}"
+
+
+class TcpEndpoints:
+    # Local listeners standing in for proxy endpoints:
+    #   "ok"        accepts (after accept_delay seconds) and closes
+    #   "refused"   closed port, connect fails immediately
+    #   "blackhole" full accept queue, SYNs are dropped until the probe times out
+    def __init__(self, ok=1, refused=1, blackhole=1, accept_delay=0):
+        self.accept_delay = accept_delay
+        self.sockets = []
+        self.running = True
+        self.endpoints = {"ok": [], "refused": [], "blackhole": []}
+        for _ in range(ok):
+            sock = self._listen(128)
+            threading.Thread(target=self._accept_loop, args=(sock,), daemon=True).start()
+            self.endpoints["ok"].append(sock.getsockname())
+        for _ in range(refused):
+            sock = socket.socket()
+            sock.bind(("127.0.0.1", 0))
+            self.endpoints["refused"].append(sock.getsockname())
+            sock.close()
+        for _ in range(blackhole):
+            sock = self._listen(0)
+            # Fill the backlog so later handshakes are dropped
+            for _ in range(2):
+                filler = socket.socket()
+                filler.setblocking(False)
+                filler.connect_ex(sock.getsockname())
+                self.sockets.append(filler)
+            self.endpoints["blackhole"].append(sock.getsockname())
+
+    def _listen(self, backlog):
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(backlog)
+        self.sockets.append(sock)
+        return sock
+
+    def _accept_loop(self, sock):
+        while self.running:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return
+            if self.accept_delay:
+                time.sleep(self.accept_delay)
+            conn.close()
+
+    def all(self):
+        return [
+            (kind, host, port)
+            for kind, addresses in self.endpoints.items()
+            for host, port in addresses
+        ]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.running = False
+        for sock in self.sockets:
+            sock.close()
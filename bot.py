@@ -1,15 +1,25 @@
 import os
 import json
 import logging
+import functools
 from logging.handlers import RotatingFileHandler
 import telebot # type: ignore
 from telebot import types # type: ignore
 from apscheduler.schedulers.background import BackgroundScheduler # type: ignore
-from supabase_db import get_proxies
+from supabase_db import get_proxies, proxies_generation, warm_cache
+from render_cache import RenderCache
+from log_buffer import RingBufferHandler, read_history
+from metrics import HANDLER_SECONDS
+from channel_scores import ChannelScores
+from broadcast import Broadcaster
+import revalidator
+import readiness
+from coordination import LeaderElector, get_leader_lock
 from base64 import b64encode
 from datetime import datetime, timedelta
 import threading
 import time
+from collections import deque
 from dotenv import load_dotenv # type: ignore
 
 # Load environment variables
@@ -18,6 +28,12 @@ BOT_TOKEN = os.environ["BOT_TOKEN"]
 GROUP_CHAT_IDS = [int(id.strip()) for id in os.environ["GROUP_CHAT_ID"].split(",")]
 ADMIN_IDS = [int(id) for id in os.environ["ADMIN_IDS"].split(",")]
 
+# Update delivery: "polling" (default) or "webhook" served by web_app
+BOT_MODE = os.environ.get("BOT_MODE", "polling")
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")
+
 # Initialize logging
 os.makedirs("logs", exist_ok=True)
 logger = logging.getLogger("ProxyBot")
@@ -27,24 +43,96 @@ formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(messag
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
+# Recent records are also kept in memory for the Logs views
+LOG_FILE = "logs/bot.log"
+MAX_LOG_LINES = 50
+ring_handler = RingBufferHandler(capacity=500)
+ring_handler.setFormatter(formatter)
+logger.addHandler(ring_handler)
+
+def recent_logs(limit=10, min_level=logging.NOTSET):
+    lines = ring_handler.records(limit, min_level)
+    if len(lines) < limit:
+        # Buffer is cold after a restart; fall back to the rotated files
+        lines = read_history(LOG_FILE, limit, backups=handler.backupCount, min_level=min_level)
+    return lines
+
 # Initialize bot with proxy support
 proxy_url = os.environ.get('TELEGRAM_PROXY', None)
 if proxy_url:
     telebot.apihelper.proxy = {'https': proxy_url}
 
+# Updates are handled on a bounded worker pool; each chat may only have a few
+# handlers in flight so one busy chat cannot occupy every worker. Further
+# updates from that chat are queued (up to CHAT_QUEUE of them) without holding
+# a worker and run by the chat's next finishing handler; ones that waited
+# longer than CHAT_WAIT_SECONDS, or did not fit, get a busy notice instead.
+BOT_WORKERS = int(os.environ.get("BOT_WORKERS", 16))
+CHAT_CONCURRENCY = int(os.environ.get("CHAT_CONCURRENCY", 2))
+CHAT_QUEUE = int(os.environ.get("CHAT_QUEUE", 4))
+CHAT_WAIT_SECONDS = float(os.environ.get("CHAT_WAIT_SECONDS", 15))
+
 try:
-    bot = telebot.TeleBot(BOT_TOKEN)
+    bot = telebot.TeleBot(BOT_TOKEN, threaded=True, num_threads=BOT_WORKERS)
     print("Bot initialized successfully")
 except Exception as e:
     print(f"Failed to initialize bot: {e}")
     exit(1)
 
+# Rate-limited parallel sender for group broadcasts
+broadcaster = Broadcaster(bot)
+
 # Scheduler
 scheduler = BackgroundScheduler()
 scheduler_started = False
 
+def add_scheduled_jobs():
+    scheduler.add_job(send_updates, "interval", minutes=30, id="send_updates", replace_existing=True)
+    # Stored proxies/configs are re-probed in small batches in the background
+    scheduler.add_job(revalidator.run_once, "interval", seconds=revalidator.REVALIDATE_SECONDS,
+                      id="revalidate", replace_existing=True, max_instances=1, coalesce=True)
+
+def start_scheduler():
+    global scheduler_started
+    if scheduler_started:
+        return False
+    add_scheduled_jobs()
+    if not scheduler.running:
+        scheduler.start()
+    scheduler_started = True
+    return True
+
+def stop_scheduler():
+    global scheduler_started
+    if not scheduler_started:
+        return False
+    scheduler.shutdown()
+    scheduler_started = False
+    return True
+
+# Only the replica holding the leader lock runs scheduled jobs, so running
+# several replicas does not multiply broadcasts and revalidation
+def become_leader():
+    logger.info("Elected leader, starting scheduler")
+    start_scheduler()
+    if not elector.decided.is_set():
+        # Leader from startup: send the initial message to all groups
+        # without holding up lease renewals
+        threading.Thread(target=send_initial_update, daemon=True).start()
+
+def step_down():
+    logger.warning("Lost leadership, stopping scheduler")
+    stop_scheduler()
+
+elector = LeaderElector(get_leader_lock(), on_elected=become_leader, on_lost=step_down)
+
+def next_update_time():
+    job = scheduler.get_job("send_updates") if scheduler_started else None
+    return job.next_run_time.strftime("%b-%d %H:%M") if job and job.next_run_time else "N/A"
+
 # Admin check decorator
 def admin_only(func):
+    @functools.wraps(func)
     def wrapper(message):
         if message.from_user.id in ADMIN_IDS:
             func(message)
@@ -52,6 +140,87 @@ def admin_only(func):
             bot.reply_to(message, "❌ You are not authorized to use this command.")
     return wrapper
 
+# Known callback_data values, used to bound handler metric labels
+CALLBACK_NAMES = {
+    "get_proxies", "get_configs", "status", "logs", "admin_panel",
+    "start_scheduler", "stop_scheduler", "list_channels", "back_main",
+}
+
+# Per-chat concurrency limit decorator (also records handler latency)
+chat_slots = {}  # chat_id -> [handlers running, deque of (func, update, queued at)]
+chat_slots_lock = threading.Lock()
+
+def handler_name(func, update):
+    if isinstance(update, types.CallbackQuery):
+        return f"callback:{update.data}" if update.data in CALLBACK_NAMES else "callback:unknown"
+    return func.__name__
+
+def send_busy_notice(update):
+    try:
+        if isinstance(update, types.CallbackQuery):
+            bot.answer_callback_query(update.id, "⏳ Busy, please try again in a moment")
+        else:
+            bot.reply_to(update, "⏳ Too many requests in this chat, please try again in a moment.")
+    except Exception as e:
+        logger.error(f"Failed to send busy notice: {e}")
+
+def enter_chat_slot(chat_id, func, update):
+    # True if the caller should run the update now; otherwise it was queued
+    # (None is returned when the queue is full)
+    with chat_slots_lock:
+        slot = chat_slots.get(chat_id)
+        if slot is None:
+            slot = chat_slots[chat_id] = [0, deque()]
+        if slot[0] < CHAT_CONCURRENCY:
+            slot[0] += 1
+            return True
+        if len(slot[1]) < CHAT_QUEUE:
+            slot[1].append((func, update, time.monotonic()))
+            return False
+        return None
+
+def next_chat_update(chat_id):
+    # The next queued update of the chat, or None after giving up the slot
+    with chat_slots_lock:
+        slot = chat_slots[chat_id]
+        if slot[1]:
+            return slot[1].popleft()
+        slot[0] -= 1
+        if not slot[0]:
+            del chat_slots[chat_id]
+        return None
+
+def run_chat_updates(chat_id, func, update):
+    # Runs the update, then whatever the chat queued meanwhile, on this worker
+    while True:
+        try:
+            with HANDLER_SECONDS.labels(handler_name(func, update)).time():
+                func(update)
+        except Exception as e:
+            logger.error(f"Handler {func.__name__} failed in chat {chat_id}: {e}")
+        while True:
+            queued = next_chat_update(chat_id)
+            if queued is None:
+                return
+            func, update, queued_at = queued
+            if time.monotonic() - queued_at <= CHAT_WAIT_SECONDS:
+                break
+            logger.info(f"Chat {chat_id} is busy, queued update expired")
+            send_busy_notice(update)
+
+def chat_limited(func):
+    @functools.wraps(func)
+    def wrapper(update):
+        is_callback = isinstance(update, types.CallbackQuery)
+        chat_id = update.message.chat.id if is_callback else update.chat.id
+        entered = enter_chat_slot(chat_id, func, update)
+        if entered is None:
+            logger.info(f"Chat {chat_id} is busy, update not handled")
+            send_busy_notice(update)
+        elif entered:
+            run_chat_updates(chat_id, func, update)
+    return wrapper
+
 # Function to read setting.json
 def read_settings():
     with open("setting.json", "r", encoding="utf-8") as f:
@@ -68,34 +237,55 @@ def write_settings(data):
 def format_proxy_links(proxies):
     if not proxies:
         return "No working proxies found."
-    message = "🛡️ Proxies:\n"
-    for proxy in proxies:
-        message += f"[پروکسی مهندس علایی]({proxy})\n"
-    return message
+    lines = [f"[پروکسی مهندس علایی]({proxy})\n" for proxy in proxies]
+    return "🛡️ Proxies:\n" + "".join(lines)
+
+# Rendered proxy messages, reset whenever the proxy set changes
+proxy_messages = RenderCache(proxies_generation)
+
+def render_proxy_links(proxies):
+    return proxy_messages.get(tuple(proxies), lambda: format_proxy_links(proxies))
 
 # Function to collect and send proxies
 def send_updates():
     try:
         proxies = get_proxies(20)  # 20 proxy links for group
-        proxy_message = format_proxy_links(proxies)
+        proxy_message = render_proxy_links(proxies)
         current_time = (datetime.now() + timedelta(hours=4)).strftime("%b-%d %H:%M")
         proxy_full_message = f"📢 Update {current_time}\n\n{proxy_message}"
         
-        for group_id in GROUP_CHAT_IDS:
-            try:
-                bot.send_message(chat_id=group_id, text=proxy_full_message, parse_mode='Markdown')
-            except Exception as msg_error:
-                logger.error(f"Failed to send to group {group_id}: {msg_error}")
-                for admin_id in ADMIN_IDS:
-                    try:
-                        bot.send_message(chat_id=admin_id, text=f"⚠️ Failed to send to group {group_id}. Proxy message: {proxy_full_message}")
-                        break
-                    except:
-                        continue
+        results = broadcaster.broadcast(GROUP_CHAT_IDS, proxy_full_message, parse_mode='Markdown')
+        for group_id, msg_error in results.items():
+            if msg_error is None:
+                continue
+            logger.error(f"Failed to send to group {group_id}: {msg_error}")
+            for admin_id in ADMIN_IDS:
+                try:
+                    bot.send_message(chat_id=admin_id, text=f"⚠️ Failed to send to group {group_id}. Proxy message: {proxy_full_message}")
+                    break
+                except:
+                    continue
         logger.info(f"Sent update at {current_time} with {len(proxies)} proxies")
     except Exception as e:
         logger.error(f"Error sending update: {e}")
 
+# Channel scoreboard summary for the admin panel
+def format_channel_scores(title, channels, scores, top=10):
+    lines = [f"{title}: {len(channels)}"]
+    listed = set(channels)
+    ranked = [channel for channel in scores.ranked() if channel in listed and scores.score(channel) > 0][:top]
+    for channel in ranked:
+        stats = scores.stats(channel)
+        lines.append(f"• {channel}: {stats.get('yield') or 0:.1f} working/crawl, {(stats.get('pass_rate') or 0) * 100:.0f}% alive")
+    backed_off = [channel for channel in scores.backed_off() if channel in listed]
+    lines.append(f"💤 Backed off: {len(backed_off)}")
+    if backed_off:
+        lines.append(", ".join(sorted(backed_off)[:top]) + (" …" if len(backed_off) > top else ""))
+    unscored = len(listed - set(scores.channels))
+    if unscored:
+        lines.append(f"🆕 Not crawled yet: {unscored}")
+    return "\n".join(lines)
+
 # Create inline keyboard for private messages
 def create_main_keyboard():
     keyboard = types.InlineKeyboardMarkup(row_width=2)
@@ -124,15 +314,23 @@ def create_admin_keyboard():
     )
     return keyboard
 
+# Static keyboards are serialized once and sent as JSON
+MAIN_KEYBOARD = create_main_keyboard().to_json()
+ADMIN_KEYBOARD = create_admin_keyboard().to_json()
+BACK_MAIN_MARKUP = types.InlineKeyboardMarkup().add(types.InlineKeyboardButton("🔙 Back", callback_data="back_main")).to_json()
+BACK_ADMIN_MARKUP = types.InlineKeyboardMarkup().add(types.InlineKeyboardButton("🔙 Back", callback_data="admin_panel")).to_json()
+
 # Start command with buttons
 @bot.message_handler(commands=['start'])
+@chat_limited
 def start_command(message):
     if message.chat.type == 'private':
-        bot.reply_to(message, "🚀 Welcome! Choose an option:", reply_markup=create_main_keyboard())
+        bot.reply_to(message, "🚀 Welcome! Choose an option:", reply_markup=MAIN_KEYBOARD)
     logger.info(f"User {message.from_user.id} used /start")
 
 # Callback query handler
 @bot.callback_query_handler(func=lambda call: True)
+@chat_limited
 def callback_query(call):
     if call.data == "get_proxies":
         get_proxy_callback(call)
@@ -151,7 +349,7 @@ def callback_query(call):
     elif call.data == "list_channels":
         list_channels_callback(call)
     elif call.data == "back_main":
-        bot.edit_message_text("🚀 Welcome! Choose an option:", call.message.chat.id, call.message.message_id, reply_markup=create_main_keyboard())
+        bot.edit_message_text("🚀 Welcome! Choose an option:", call.message.chat.id, call.message.message_id, reply_markup=MAIN_KEYBOARD)
 
 def get_proxy_callback(call):
     try:
@@ -159,33 +357,31 @@ def get_proxy_callback(call):
         if not proxies:
             bot.answer_callback_query(call.id, "No working proxies found.")
             return
-        proxy_message = format_proxy_links(proxies)
-        bot.edit_message_text(proxy_message, call.message.chat.id, call.message.message_id, parse_mode='Markdown', reply_markup=types.InlineKeyboardMarkup().add(types.InlineKeyboardButton("🔙 Back", callback_data="back_main")))
+        proxy_message = render_proxy_links(proxies)
+        bot.edit_message_text(proxy_message, call.message.chat.id, call.message.message_id, parse_mode='Markdown', reply_markup=BACK_MAIN_MARKUP)
     except Exception as e:
         bot.answer_callback_query(call.id, "Error getting proxies")
 
 def get_config_callback(call):
     config_message = "برای استفاده از کانفیگ ها از اپلیکیشن TgProx استفاده کنید"
-    bot.edit_message_text(config_message, call.message.chat.id, call.message.message_id, reply_markup=types.InlineKeyboardMarkup().add(types.InlineKeyboardButton("🔙 Back", callback_data="back_main")))
+    bot.edit_message_text(config_message, call.message.chat.id, call.message.message_id, reply_markup=BACK_MAIN_MARKUP)
 
 def status_callback(call):
     if call.from_user.id not in ADMIN_IDS:
         bot.answer_callback_query(call.id, "❌ Admin only")
         return
     status = "running" if scheduler_started else "stopped"
-    last_update = scheduler.get_jobs()[0].next_run_time.strftime("%b-%d %H:%M") if scheduler_started and scheduler.get_jobs() else "N/A"
+    last_update = next_update_time()
     response = f"📊 Bot Status: {status}\nNext Update: {last_update}"
-    bot.edit_message_text(response, call.message.chat.id, call.message.message_id, reply_markup=types.InlineKeyboardMarkup().add(types.InlineKeyboardButton("🔙 Back", callback_data="back_main")))
+    bot.edit_message_text(response, call.message.chat.id, call.message.message_id, reply_markup=BACK_MAIN_MARKUP)
 
 def logs_callback(call):
     if call.from_user.id not in ADMIN_IDS:
         bot.answer_callback_query(call.id, "❌ Admin only")
         return
     try:
-        with open("logs/bot.log", "r", encoding="utf-8") as f:
-            lines = f.readlines()[-10:]
-        log_text = "".join(lines) or "No logs available."
-        bot.edit_message_text(f"📜 Recent Logs:\n```\n{log_text}\n```", call.message.chat.id, call.message.message_id, parse_mode='Markdown', reply_markup=types.InlineKeyboardMarkup().add(types.InlineKeyboardButton("🔙 Back", callback_data="back_main")))
+        log_text = "\n".join(recent_logs(10)) or "No logs available."
+        bot.edit_message_text(f"📜 Recent Logs:\n```\n{log_text}\n```", call.message.chat.id, call.message.message_id, parse_mode='Markdown', reply_markup=BACK_MAIN_MARKUP)
     except Exception as e:
         bot.answer_callback_query(call.id, "Error reading logs")
 
@@ -193,18 +389,15 @@ def admin_panel_callback(call):
     if call.from_user.id not in ADMIN_IDS:
         bot.answer_callback_query(call.id, "❌ Admin only")
         return
-    bot.edit_message_text("⚙️ Admin Panel:", call.message.chat.id, call.message.message_id, reply_markup=create_admin_keyboard())
+    bot.edit_message_text("⚙️ Admin Panel:", call.message.chat.id, call.message.message_id, reply_markup=ADMIN_KEYBOARD)
 
 def start_scheduler_callback(call):
     if call.from_user.id not in ADMIN_IDS:
         bot.answer_callback_query(call.id, "❌ Admin only")
         return
-    global scheduler_started
-    if not scheduler_started:
-        scheduler.add_job(send_updates, "interval", minutes=30)
-        if not scheduler.running:
-            scheduler.start()
-        scheduler_started = True
+    if not elector.is_leader:
+        bot.answer_callback_query(call.id, "⚠️ Another replica runs the scheduler")
+    elif start_scheduler():
         bot.answer_callback_query(call.id, "✅ Scheduler started (30 min intervals)")
     else:
         bot.answer_callback_query(call.id, "⚠️ Already running")
@@ -213,10 +406,7 @@ def stop_scheduler_callback(call):
     if call.from_user.id not in ADMIN_IDS:
         bot.answer_callback_query(call.id, "❌ Admin only")
         return
-    global scheduler_started
-    if scheduler_started:
-        scheduler.shutdown()
-        scheduler_started = False
+    if stop_scheduler():
         bot.answer_callback_query(call.id, "✅ Scheduler stopped")
     else:
         bot.answer_callback_query(call.id, "⚠️ Not running")
@@ -226,19 +416,22 @@ def list_channels_callback(call):
         bot.answer_callback_query(call.id, "❌ Admin only")
         return
     settings = read_settings()
-    proxy_channels = "\n".join(settings["proxy_channels"]) or "None"
-    config_channels = "\n".join(settings["config_channels"]) or "None"
-    response = f"📚 Proxy Channels:\n{proxy_channels}\n\n📚 Config Channels:\n{config_channels}"
-    bot.edit_message_text(response, call.message.chat.id, call.message.message_id, reply_markup=types.InlineKeyboardMarkup().add(types.InlineKeyboardButton("🔙 Back", callback_data="admin_panel")))
+    response = "\n\n".join([
+        format_channel_scores("📚 Proxy Channels", settings["proxy_channels"], ChannelScores("proxies")),
+        format_channel_scores("📚 Config Channels", settings["config_channels"], ChannelScores("configs")),
+    ])
+    bot.edit_message_text(response, call.message.chat.id, call.message.message_id, reply_markup=BACK_ADMIN_MARKUP)
 
 # Group commands
 @bot.message_handler(commands=['getconfig'])
+@chat_limited
 def get_config_command(message):
     config_message = "برای استفاده از کانفیگ ها از اپلیکیشن TgProx استفاده کنید"
     bot.reply_to(message, config_message)
     logger.info(f"User {message.from_user.id} requested configs in {message.chat.type}")
 
 @bot.message_handler(commands=['getproxy'])
+@chat_limited
 def get_proxy_command(message):
     try:
         if message.chat.type == 'private':
@@ -250,7 +443,7 @@ def get_proxy_command(message):
             bot.reply_to(message, "No working proxies found.")
             return
         
-        proxy_message = format_proxy_links(proxies)
+        proxy_message = render_proxy_links(proxies)
         bot.reply_to(message, proxy_message, parse_mode='Markdown')
         
         logger.info(f"User {message.from_user.id} requested proxies in {message.chat.type}")
@@ -259,48 +452,87 @@ def get_proxy_command(message):
         logger.error(f"Error getting proxies: {e}")
 
 @bot.message_handler(commands=['status'])
+@chat_limited
 @admin_only
 def status_command(message):
     status = "running" if scheduler_started else "stopped"
-    last_update = scheduler.get_jobs()[0].next_run_time.strftime("%b-%d %H:%M") if scheduler_started and scheduler.get_jobs() else "N/A"
+    last_update = next_update_time()
     response = f"📊 Bot Status: {status}\nNext Update: {last_update}"
     bot.reply_to(message, response)
     logger.info(f"Admin {message.from_user.id} checked status")
 
 @bot.message_handler(commands=['logs'])
+@chat_limited
 @admin_only
 def logs_command(message):
+    # Usage: /logs [level] [count], e.g. /logs error 20
     try:
-        with open("logs/bot.log", "r", encoding="utf-8") as f:
-            lines = f.readlines()[-10:]
-        log_text = "".join(lines) or "No logs available."
+        min_level = logging.NOTSET
+        count = 10
+        for arg in message.text.split()[1:]:
+            if arg.isdigit():
+                count = min(int(arg), MAX_LOG_LINES)
+            elif isinstance(logging.getLevelName(arg.upper()), int):
+                min_level = logging.getLevelName(arg.upper())
+        log_text = "\n".join(recent_logs(count, min_level)) or "No logs available."
         bot.reply_to(message, f"📜 Recent Logs:\n```\n{log_text}\n```", parse_mode='Markdown')
         logger.info(f"Admin {message.from_user.id} viewed logs")
     except Exception as e:
         bot.reply_to(message, f"❌ Error reading logs: {e}")
         logger.error(f"Error reading logs: {e}")
 
-# Main function to start bot
-def main():
-    print("Bot starting...")
-    logger.info("Bot started")
-    
-    global scheduler_started
+# Register the webhook; updates then arrive through web_app
+def start_webhook():
+    if not WEBHOOK_URL or not WEBHOOK_SECRET:
+        print("WEBHOOK_URL and WEBHOOK_SECRET are required for webhook mode")
+        return False
     try:
-        scheduler.add_job(send_updates, "interval", minutes=30)
-        scheduler.start()
-        scheduler_started = True
-        print("Scheduler started")
+        bot.remove_webhook()
+        bot.set_webhook(url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH, secret_token=WEBHOOK_SECRET)
+        print("Webhook registered")
+        logger.info("Webhook registered")
+        return True
     except Exception as e:
-        print(f"Scheduler error: {e}")
-    
-    # Send initial message to all groups
+        print(f"Webhook error: {e}")
+        logger.error(f"Webhook error: {e}")
+        return False
+
+def send_initial_update():
     try:
         send_updates()
         print("Initial update sent")
     except Exception as e:
         print(f"Initial update failed: {e}")
+
+# Main function to start bot. serve_webhook is set by web_app, which hosts
+# the webhook endpoint; run on its own the bot always polls.
+def main(serve_webhook=False):
+    print("Bot starting...")
+    logger.info("Bot started")
+
+    # Readiness waits for the proxy cache and for update delivery; warm-up
+    # runs in the background so polling starts without waiting on Supabase
+    readiness.register("bot")
+    readiness.warm_up([("supabase", warm_cache)])
     
+    # The first election runs on the elector thread too: with the Supabase
+    # backend it is a database call, and polling must not wait for it
+    elector.start()
+    
+    if BOT_MODE == "webhook" and not serve_webhook:
+        print("Webhook mode needs web_app to serve the endpoint, falling back to polling")
+    elif BOT_MODE == "webhook":
+        if start_webhook():
+            readiness.mark_ready("bot")
+            return
+        print("Webhook setup failed, falling back to polling")
+
+    try:
+        bot.remove_webhook()
+    except Exception as e:
+        print(f"Failed to remove webhook: {e}")
+
+    readiness.mark_ready("bot")
     while True:
         try:
             print("Starting bot polling...")
@@ -312,8 +544,8 @@ def main():
             print(f"Polling error: {e}")
             time.sleep(5)
     
-    if scheduler_started:
-        scheduler.shutdown()
+    stop_scheduler()
+    elector.lock.release()
     print("Bot stopped")
 
 if __name__ == "__main__":
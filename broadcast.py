@@ -0,0 +1,105 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from telebot.apihelper import ApiTelegramException  # type: ignore
+from metrics import TELEGRAM_SEND_SECONDS, TELEGRAM_429
+
+
+# Telegram allows about 30 messages per second overall and 20 per minute
+# into a single group
+GLOBAL_RATE = 30
+CHAT_RATE = 20 / 60
+MAX_RETRIES = 3
+BROADCAST_WORKERS = 16
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        # Drains the bucket so nothing is sent for the given time (used for 429)
+        with self.lock:
+            self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+def retry_after(error):
+    try:
+        return int(error.result_json["parameters"]["retry_after"])
+    except Exception:
+        return None
+
+
+class Broadcaster:
+    def __init__(self, bot, global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE,
+                 max_retries=MAX_RETRIES, workers=BROADCAST_WORKERS):
+        self.bot = bot
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_buckets = {}
+        self.lock = threading.Lock()
+        self.max_retries = max_retries
+        self.workers = workers
+
+    def chat_bucket(self, chat_id):
+        with self.lock:
+            bucket = self.chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, 1)
+            return bucket
+
+    def send(self, chat_id, text, **kwargs):
+        # Returns None on success or the last error after all retries
+        bucket = self.chat_bucket(chat_id)
+        error = None
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            self.global_bucket.acquire()
+            try:
+                with TELEGRAM_SEND_SECONDS.time():
+                    self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                return None
+            except ApiTelegramException as e:
+                error = e
+                wait = retry_after(e)
+                if wait is not None:
+                    TELEGRAM_429.inc()
+                    # The next acquire() blocks until retry_after has passed
+                    bucket.pause(wait)
+                    time.sleep(random.uniform(0, 1))
+                    continue
+                if e.error_code < 500:
+                    return e
+            except Exception as e:
+                error = e
+            time.sleep(2 ** attempt + random.uniform(0, 1))
+        return error
+
+    def broadcast(self, chat_ids, text, **kwargs):
+        # Sends to every chat in parallel; returns {chat_id: error or None}
+        chat_ids = list(dict.fromkeys(chat_ids))
+        if not chat_ids:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(chat_ids))) as pool:
+            futures = {
+                chat_id: pool.submit(self.send, chat_id, text, **kwargs)
+                for chat_id in chat_ids
+            }
+            return {chat_id: future.result() for chat_id, future in futures.items()}
@@ -0,0 +1,119 @@
+import queue
+import threading
+import time
+
+
+class SWRCache:
+    # Stale-while-revalidate cache: fresh entries are served directly, stale
+    # ones are served while a single background thread reloads them, and
+    # concurrent misses for the same key share one load
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.inflight = {}
+        self.generations = {}
+        # Values dropped by invalidate, kept only to tell whether the reload
+        # changed anything
+        self.previous = {}
+        self.loaders = {}
+        self.refresh_queue = queue.Queue()
+        self.refreshing = set()
+        # Keys expired while their refresh was already running; that refresh
+        # may have read the data from before the write, so it runs again
+        self.reload = set()
+        self.refresher = None
+
+    def get(self, key, loader):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, loaded_at = entry
+                if time.monotonic() - loaded_at >= self.ttl:
+                    self._schedule_refresh(key, loader)
+                return value
+            waiter = self.inflight.get(key)
+            if waiter is None:
+                waiter = self.inflight[key] = threading.Event()
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            waiter.wait()
+            with self.lock:
+                entry = self.entries.get(key)
+            if entry is None:
+                raise LookupError(f"Cache load failed for {key!r}")
+            return entry[0]
+
+        try:
+            return self._load(key, loader)
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            waiter.set()
+
+    def generation(self, key):
+        with self.lock:
+            return self.generations.get(key, 0)
+
+    def invalidate(self, key=None):
+        with self.lock:
+            if key is None:
+                self.previous.update(self.entries)
+                self.entries.clear()
+            elif key in self.entries:
+                self.previous[key] = self.entries.pop(key)
+
+    def expire(self, key=None):
+        # Marks entries stale after a write: readers keep getting the current
+        # value while the background thread reloads it
+        with self.lock:
+            keys = list(self.entries) if key is None else [key]
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+                self.entries[key] = (entry[0], float("-inf"))
+                if key in self.refreshing:
+                    self.reload.add(key)
+                else:
+                    self._schedule_refresh(key, self.loaders[key])
+
+    def _load(self, key, loader):
+        value = loader()
+        with self.lock:
+            previous = self.entries.get(key) or self.previous.get(key)
+            self.previous.pop(key, None)
+            if previous is None or previous[0] != value:
+                self.generations[key] = self.generations.get(key, 0) + 1
+            self.entries[key] = (value, time.monotonic())
+            self.loaders[key] = loader
+        return value
+
+    def _schedule_refresh(self, key, loader):
+        # Called with self.lock held
+        if key in self.refreshing:
+            return
+        self.refreshing.add(key)
+        self.refresh_queue.put((key, loader))
+        if self.refresher is None or not self.refresher.is_alive():
+            self.refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+            self.refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            key, loader = self.refresh_queue.get()
+            try:
+                self._load(key, loader)
+            except Exception as e:
+                # Keep serving the stale value until the next attempt succeeds
+                print(f"Cache refresh failed for {key!r}: {e}")
+            finally:
+                with self.lock:
+                    if key in self.reload:
+                        self.reload.discard(key)
+                        self.refresh_queue.put((key, loader))
+                    else:
+                        self.refreshing.discard(key)
@@ -0,0 +1,89 @@
+import os
+import json
+import time
+import threading
+from uri_parser import try_parse
+
+
+DEDUP_DIR = os.environ.get("DEDUP_DIR", ".")
+
+
+def canonical_key(link):
+    # Reduces a proxy/config link to (protocol, host, port, credential) so that
+    # links differing only by remark, parameter order or vmess JSON key order
+    # compare equal. Returns None for links that cannot be parsed.
+    endpoint = try_parse(link)
+    return endpoint.key() if endpoint is not None else None
+
+
+def key_string(key):
+    return "|".join(str(part) for part in key)
+
+
+class DedupIndex:
+    # Canonical key -> most recently collected link, persisted between
+    # collection runs to tell endpoints that are new from ones seen before
+    def __init__(self, name, directory=DEDUP_DIR):
+        self.path = os.path.join(directory, f"dedup_{name}.json")
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.seen = set()
+        # Keys first seen in this run (not present in the persisted index)
+        self.new_keys = set()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error reading dedup index {self.path}: {e}")
+
+    def _record(self, link):
+        # Stores link as the endpoint's current link and returns its key plus
+        # whether this is the first sighting in this run. The newest link
+        # wins: a server that keeps its credential and address but changes
+        # transport parameters (path, sni, type...) must not keep being
+        # published with the old ones.
+        key = canonical_key(link)
+        if key is None:
+            return None, False
+        key = key_string(key)
+        with self.lock:
+            if key not in self.entries:
+                self.new_keys.add(key)
+            self.entries[key] = {"link": link, "last_seen": int(time.time())}
+            first = key not in self.seen
+            self.seen.add(key)
+        return key, first
+
+    def add(self, link):
+        # Returns the link the first time an endpoint is seen in this run,
+        # None for duplicates and unparseable links
+        key, first = self._record(link)
+        return link if first else None
+
+    def dedupe(self, links):
+        # One link per endpoint, in order of first appearance; for endpoints
+        # listed more than once the last (newest) link is kept
+        keys = []
+        for link in links:
+            key, first = self._record(link)
+            if first:
+                keys.append(key)
+        with self.lock:
+            return [self.entries[key]["link"] for key in keys]
+
+    def save(self, max_age=7 * 24 * 3600):
+        # Endpoints not seen for max_age seconds are dropped
+        cutoff = int(time.time()) - max_age
+        with self.lock:
+            self.entries = {
+                key: entry
+                for key, entry in self.entries.items()
+                if entry.get("last_seen", 0) >= cutoff
+            }
+            data = json.dumps(self.entries, indent=2, sort_keys=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
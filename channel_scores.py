@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import threading
+from canonical import canonical_key, key_string
+
+
+SCORES_DIR = os.environ.get("SCORES_DIR", ".")
+REVISIT_SECONDS = int(os.environ.get("CHANNEL_REVISIT_MINUTES", 30)) * 60
+MAX_BACKOFF_STEPS = 6
+# Weight of the latest crawl in the moving averages
+ALPHA = 0.3
+
+
+def _ewma(previous, value):
+    if previous is None:
+        return value
+    return (1 - ALPHA) * previous + ALPHA * value
+
+
+class ChannelScores:
+    # Per-channel crawl statistics used to decide how often each channel is
+    # revisited. Dead channels and channels that never yield new working
+    # configs are backed off exponentially; productive ones stay on the base
+    # revisit interval.
+    def __init__(self, name, directory=SCORES_DIR, revisit=REVISIT_SECONDS):
+        self.path = os.path.join(directory, f"channel_scores_{name}.json")
+        self.revisit = revisit
+        self.lock = threading.Lock()
+        self.channels = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.channels = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error reading channel scores {self.path}: {e}")
+
+    def _entry(self, channel):
+        return self.channels.setdefault(channel, {
+            "failures": 0,
+            "idle": 0,
+            "last_success": None,
+            "next_due": 0,
+            "yield": None,
+            "pass_rate": None,
+            "posts_per_day": None,
+        })
+
+    def due(self, channels, now=None):
+        now = now or time.time()
+        with self.lock:
+            return [
+                channel for channel in channels
+                if self.channels.get(channel, {}).get("next_due", 0) <= now
+            ]
+
+    def record_fetch(self, channel, ok, new_posts=0, now=None):
+        now = now or time.time()
+        with self.lock:
+            entry = self._entry(channel)
+            if not ok:
+                entry["failures"] += 1
+            else:
+                if entry["last_success"]:
+                    days = max(now - entry["last_success"], 60) / 86400
+                    entry["posts_per_day"] = _ewma(entry["posts_per_day"], new_posts / days)
+                entry["failures"] = 0
+                entry["last_success"] = now
+            self._schedule(entry, now)
+
+    def record_yield(self, channel, found, new, working, now=None):
+        now = now or time.time()
+        with self.lock:
+            entry = self._entry(channel)
+            entry["yield"] = _ewma(entry["yield"], working)
+            if found:
+                entry["pass_rate"] = _ewma(entry["pass_rate"], working / found)
+            entry["idle"] = 0 if new and working else entry["idle"] + 1
+            self._schedule(entry, now)
+
+    def _schedule(self, entry, now):
+        steps = entry["failures"] or max(entry["idle"] - 1, 0)
+        entry["next_due"] = now + self.revisit * 2 ** min(steps, MAX_BACKOFF_STEPS)
+
+    def score(self, channel):
+        entry = self.channels.get(channel, {})
+        return (entry.get("yield") or 0) * (entry.get("pass_rate") or 0)
+
+    def ranked(self):
+        with self.lock:
+            return sorted(self.channels, key=self.score, reverse=True)
+
+    def backed_off(self, now=None):
+        now = now or time.time()
+        with self.lock:
+            return [
+                channel for channel, entry in self.channels.items()
+                if entry["next_due"] - now > self.revisit
+            ]
+
+    def stats(self, channel):
+        with self.lock:
+            return dict(self.channels.get(channel, {}))
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.channels, indent=2, sort_keys=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+
+def _keys(links):
+    keys = set()
+    for link in links:
+        key = canonical_key(link)
+        if key is not None:
+            keys.add(key_string(key))
+    return keys
+
+
+def record_cycle(scores, found_by_channel, new_keys, working_links):
+    # Attributes one collection cycle's results back to the channels they
+    # came from: links found, endpoints new to the dedup index, and how many
+    # of those passed probing
+    working = _keys(working_links)
+    for channel, links in found_by_channel.items():
+        keys = _keys(links)
+        scores.record_yield(
+            channel,
+            found=len(keys),
+            new=len(keys & new_keys),
+            working=len(keys & working),
+        )
+    scores.save()
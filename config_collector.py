@@ -1,21 +1,23 @@
-from bs4 import BeautifulSoup
-import requests
+import re
 import json
-from datetime import datetime, timedelta
-from pinger import ping
-
-
-current_date_time = datetime.now()
-
-current_month = current_date_time.strftime("%b")
-
-current_day = current_date_time.strftime("%d")
-
-new_date_time = current_date_time + timedelta(hours=4)
-
-updated_hour = new_date_time.strftime("%H")
-
-final_string = f"{current_month}-{current_day}-{updated_hour}"
+from datetime import datetime, timedelta, timezone
+from pinger import ping_many
+from probe_cache import get_probe_cache
+from fetcher import fetch
+from crawler import crawl
+from tme_parser import extract_messages
+from cursor_store import CursorStore
+from canonical import DedupIndex
+from channel_scores import ChannelScores, record_cycle
+from coordination import shard
+
+
+def updated_on():
+    # Remark timestamp for this cycle; computed per call so a long-running
+    # process does not keep stamping the time it was started
+    current_date_time = datetime.now()
+    updated_hour = (current_date_time + timedelta(hours=4)).strftime("%H")
+    return current_date_time.strftime("%b-%d-") + updated_hour
 
 
 def read_db():
@@ -25,91 +27,96 @@ def read_db():
             database = json.loads(database)
             return database
     except Exception:
+        default_db = {"proxy_channels": [], "config_channels": []}
         with open("setting.json", "w") as json_file:
-            default_db = {"proxy_channels": [], "config_channels": []}
-        default_db = json.dumps(default_db, indent=2, sort_keys=True)
-        json_file.write(default_db)
+            json_file.write(json.dumps(default_db, indent=2, sort_keys=True))
         return default_db
 
-
-db = read_db()
+CONFIG_RE = re.compile(r"(?:vless|vmess|ss|trojan)://[^\s<>\"']+")
 
 
 def get_messages(channel_link):
-    configs = []
-    request = requests.get(channel_link).content
-    document = BeautifulSoup(request, "html.parser")
-
-    final_text = document.find_all(
-        "div", class_="tgme_widget_message_text js-message_text"
-    )
-
-    codes = []
-    for message in final_text[-3:]:
-        code_tags = document.find_all("code")
-        for code_tag in code_tags:
-            code_content = code_tag.text.strip()
-            if (
-                "vless://"
-                or "ss://"
-                or "vmess://"
-                or "trojan://" in code_content + message.text
-            ):
-                codes.append(code_content)
-
-    codes = list(set(codes))
+    content = fetch(channel_link)
+    if content is None:
+        return []
+    return parse_messages(content)
 
-    for code in codes:
-        vmess_parts = "" if None else code.split("vmess://")
-        vless_parts = "" if None else code.split("vless://")
-        ss_parts = "" if None else code.split("ss://")
-        trojan_parts = "" if None else code.split("trojan://")
-
-        for part in vmess_parts + vless_parts + ss_parts + trojan_parts:
-            if "ss://" or "vmess://" or "vless://" or "trojan://" in part:
-                config = part.split("#")[0]
-                if config.startswith(
-                    "vless://" or "ss://" or "vmess://" or "trojan://"
-                ):
-                    configs.append(config)
 
-    return configs
+def parse_messages(content):
+    return parse_page(content)[0]
 
 
-def remove_duplicates(input_list):
-    unique_list = []
-    for item in input_list:
-        if item not in unique_list:
-            unique_list.append(item)
-    return unique_list
+def parse_page(content, after_id=0):
+    messages = extract_messages(content, after_id)
+    last_id = max([after_id] + [message.id for message in messages])
 
+    # First crawl of a channel only looks at the most recent posts
+    if not after_id:
+        messages = messages[-3:]
 
-def collect_configs():
-    links = []
-    for channel_name in db["config_channels"]:
-        link = "https://t.me/s/" + channel_name
-        links.append(link)
+    codes = set()
+    for message in messages:
+        codes.update(message.codes)
 
-    collected = []
-    for link in links:
-        collected.extend(get_messages(link))
+    return extract_configs(codes), last_id
 
-    configs = remove_duplicates(collected)
 
-    for config in configs:
-        is_working = ping(config)
-        if not is_working:
-            configs.remove(config)
+def extract_configs(codes):
+    configs = []
+    for code in codes:
+        for match in CONFIG_RE.finditer(code):
+            configs.append(match.group(0).split("#")[0])
+    return configs
+
 
+def collect_config_rows(cursors=None):
+    # cursors is advanced but not saved; see pipeline.run_collection
+    if cursors is None:
+        cursors = CursorStore()
+    scores = ChannelScores("configs")
+    # Read per cycle rather than at import, so channel edits apply without a
+    # restart; with several workers each crawls only its own shard
+    channels = scores.due(shard(read_db()["config_channels"]))
+    collected = []
+    found_by_channel = {}
+    for channel, configs in crawl(channels, parse_page, cursors, scores):
+        collected.extend(configs)
+        found_by_channel[channel] = configs
+
+    dedup = DedupIndex("configs")
+    configs = dedup.dedupe(collected)
+    dedup.save()
+
+    probe_cache = get_probe_cache()
+    latencies = {
+        config: rtt for config, rtt in ping_many(configs, cache=probe_cache) if rtt is not None
+    }
+    probe_cache.save()
+    record_cycle(scores, found_by_channel, dedup.new_keys, latencies)
+    checked_at = datetime.now(timezone.utc).isoformat()
+
+    updated = updated_on()
+    rows = []
     index = 0
     for config in configs:
+        if config not in latencies:
+            continue
         if index == 0:
-            config_string = f"#✅ Updated on {final_string}:00 | 🔑 Collected by TgProx"
+            config_string = f"#✅ Updated on {updated}:00 | 🔑 Collected by TgProx"
         else:
             config_string = f"#🔑 Collected by TgProx | Config No.{index}"
-        config_final = config + config_string
-        configs[index] = config_final
+        rows.append(
+            {
+                "config": config + config_string,
+                "latency_ms": round(latencies[config]),
+                "last_success": checked_at,
+            }
+        )
         index += 1
 
-    print(f"{index +1} Configs Collected Successfully")
-    return configs
+    print(f"{len(rows)} Configs Collected Successfully")
+    return rows
+
+
+def collect_configs():
+    return [row["config"] for row in collect_config_rows()]
@@ -0,0 +1,240 @@
+import os
+import time
+import socket
+import sqlite3
+import hashlib
+import logging
+import threading
+
+
+# Leader election backend: "supabase" (lease row shared by every replica,
+# needs migrations/004_leader_leases.sql), or the local stand-ins "file"
+# (flock) and "sqlite" (lease row in a local database) for a single host
+# and tests, or "none" (every replica is leader)
+LEADER_BACKEND = os.environ.get("LEADER_BACKEND", "supabase")
+LEADER_LOCK_PATH = os.environ.get("LEADER_LOCK_PATH")
+LEADER_LEASE_SECONDS = int(os.environ.get("LEADER_LEASE_SECONDS", 30))
+LEADER_RENEW_SECONDS = int(os.environ.get("LEADER_RENEW_SECONDS", 10))
+
+# This worker's slice of the channel list
+WORKER_INDEX = int(os.environ.get("WORKER_INDEX", 0))
+WORKER_COUNT = int(os.environ.get("WORKER_COUNT", 1))
+
+# Child of the bot's logger, so lock errors reach its log file and /logs
+logger = logging.getLogger("ProxyBot.coordination")
+
+# PostgREST / Postgres error codes for a function that does not exist
+MISSING_FUNCTION_CODES = ("PGRST202", "42883")
+
+
+class LeaseUnavailable(RuntimeError):
+    # The lease backend is not set up, so this replica can never lead
+    pass
+
+
+def holder_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class FileLeaderLock:
+    # Exclusive flock held for as long as this process is leader. The kernel
+    # drops it when the process dies, so there is no lease to expire.
+    def __init__(self, path="leader.lock"):
+        self.path = path
+        self.fd = None
+
+    def try_acquire(self):
+        if self.fd is not None:
+            return True
+        import fcntl
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, holder_id().encode())
+        self.fd = fd
+        return True
+
+    def release(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class SqliteLeaderLock:
+    # Lease row renewed by the leader; another holder may take it over once
+    # it has not been renewed for lease_seconds
+    def __init__(self, path="coordination.db", name="scheduler", lease_seconds=LEADER_LEASE_SECONDS):
+        self.path = path
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.holder = holder_id()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level="IMMEDIATE")
+
+    def try_acquire(self):
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS leases "
+                    "(name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires REAL NOT NULL)"
+                )
+                conn.execute(
+                    "INSERT INTO leases (name, holder, expires) VALUES (?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires = excluded.expires "
+                    "WHERE leases.holder = excluded.holder OR leases.expires < ?",
+                    (self.name, self.holder, now + self.lease_seconds, now),
+                )
+                row = conn.execute(
+                    "SELECT holder FROM leases WHERE name = ?", (self.name,)
+                ).fetchone()
+        finally:
+            conn.close()
+        return row is not None and row[0] == self.holder
+
+    def release(self):
+        if not os.path.exists(self.path):
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder)
+                )
+        finally:
+            conn.close()
+
+
+class SupabaseLeaderLock:
+    # Same lease logic as SqliteLeaderLock, run in Postgres by the
+    # try_acquire_lease function so every replica sees one lease
+    def __init__(self, name="scheduler", lease_seconds=LEADER_LEASE_SECONDS):
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.holder = holder_id()
+
+    def _client(self):
+        from supabase_db import get_client
+        client = get_client()
+        if client is None:
+            raise RuntimeError("Supabase client unavailable")
+        return client
+
+    def try_acquire(self):
+        try:
+            response = self._client().rpc("try_acquire_lease", {
+                "p_name": self.name,
+                "p_holder": self.holder,
+                "p_lease_seconds": self.lease_seconds,
+            }).execute()
+        except Exception as e:
+            if getattr(e, "code", None) in MISSING_FUNCTION_CODES:
+                raise LeaseUnavailable(
+                    "try_acquire_lease is missing, apply migrations/004_leader_leases.sql"
+                ) from e
+            raise
+        return response.data is True
+
+    def release(self):
+        try:
+            (
+                self._client().table("leader_leases")
+                .delete()
+                .eq("name", self.name)
+                .eq("holder", self.holder)
+                .execute()
+            )
+        except Exception as e:
+            print(f"Error releasing leader lease: {e}")
+
+
+class NoLeaderLock:
+    def try_acquire(self):
+        return True
+
+    def release(self):
+        pass
+
+
+def get_leader_lock(backend=LEADER_BACKEND, path=LEADER_LOCK_PATH):
+    if backend == "none":
+        return NoLeaderLock()
+    if backend == "supabase":
+        return SupabaseLeaderLock()
+    if backend == "sqlite":
+        return SqliteLeaderLock(path or "coordination.db")
+    if backend == "file":
+        return FileLeaderLock(path or "leader.lock")
+    raise ValueError(f"Unknown LEADER_BACKEND {backend!r}")
+
+
+class LeaderElector:
+    # Polls the lock on a background thread, starting with the first
+    # election, and calls on_elected/on_lost when this process gains or loses
+    # leadership. decided is set once the first election has run.
+    def __init__(self, lock, on_elected, on_lost, interval=LEADER_RENEW_SECONDS):
+        self.lock = lock
+        self.on_elected = on_elected
+        self.on_lost = on_lost
+        self.interval = interval
+        self.is_leader = False
+        self.thread = None
+        self.decided = threading.Event()
+        self.last_error = None
+
+    def check(self):
+        try:
+            held = self.lock.try_acquire()
+            self.last_error = None
+        except Exception as e:
+            # Logged once per distinct error rather than on every renewal
+            if str(e) != self.last_error:
+                if isinstance(e, LeaseUnavailable):
+                    logger.error(f"Leader election disabled: {e}")
+                else:
+                    logger.warning(f"Leader lock error: {e}")
+            self.last_error = str(e)
+            held = False
+        if held and not self.is_leader:
+            self.is_leader = True
+            self.on_elected()
+        elif not held and self.is_leader:
+            self.is_leader = False
+            self.on_lost()
+        return held
+
+    def _run(self):
+        while True:
+            self.check()
+            self.decided.set()
+            time.sleep(self.interval)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        return self.thread
+
+
+def _weight(worker, channel):
+    digest = hashlib.blake2b(f"{worker}:{channel}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def shard_of(channel, count=WORKER_COUNT):
+    # Rendezvous (highest random weight) hashing: changing the worker count
+    # only moves the channels that hash to the added or removed worker
+    return max(range(count), key=lambda worker: _weight(worker, channel))
+
+
+def shard(channels, index=WORKER_INDEX, count=WORKER_COUNT):
+    # The channels this worker crawls and probes
+    if count <= 1:
+        return list(channels)
+    return [channel for channel in channels if shard_of(channel, count) == index]
@@ -0,0 +1,131 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ProcessPoolExecutor, as_completed, wait,
+)
+from fetcher import fetch_all_responses
+from metrics import CHANNEL_BYTES, CHANNEL_FETCH_SECONDS, PARSE_SECONDS
+
+
+# Overridable so the crawl can run against a local replay server
+TME_BASE_URL = os.environ.get("TME_BASE_URL", "https://t.me/s/")
+
+# Parse stage worker processes; 1 parses inline on the crawling thread
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", os.cpu_count() or 1))
+PARSE_BACKLOG = 4
+# Parse workers must not be forked from this process: by the time the first
+# page is submitted the fetch threads are running, and a forked child can
+# deadlock on locks they held
+PARSE_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def post_id(data_post):
+    # data-post attributes look like "channel/1234"
+    try:
+        return int(data_post.rsplit("/", 1)[1])
+    except Exception:
+        return 0
+
+
+def channel_url(channel, after_id=None):
+    url = TME_BASE_URL + channel
+    if after_id:
+        url += f"?after={after_id}"
+    return url
+
+
+def conditional_headers(cursor):
+    headers = {}
+    if cursor.get("etag"):
+        headers["If-None-Match"] = cursor["etag"]
+    if cursor.get("last_modified"):
+        headers["If-Modified-Since"] = cursor["last_modified"]
+    return headers
+
+
+def _parse(parse_page, content, after_id):
+    # Runs in the parse worker; returns compact results plus the parse time
+    start = time.perf_counter()
+    items, last_id = parse_page(content, after_id)
+    return items, last_id, time.perf_counter() - start
+
+
+def crawl(channels, parse_page, cursors=None, scores=None, parse_workers=PARSE_WORKERS):
+    # Fetches each channel from its cursor and yields (channel, items) for new
+    # posts only (an empty list when unchanged). parse_page(content, after_id)
+    # must be a module-level function returning (items, last_id). Fetch
+    # outcomes are recorded in scores. Cursors are advanced in memory only;
+    # the caller saves them once the collected items are stored.
+    #
+    # Fetching (threads) and parsing (processes) run as two stages. At most
+    # PARSE_BACKLOG pages per worker wait for a parser; beyond that the
+    # fetcher stops pulling new pages until the parsers catch up.
+    urls = {}
+    headers = {}
+    for channel in channels:
+        cursor = cursors.get(channel) if cursors is not None else {}
+        url = channel_url(channel, cursor.get("last_id"))
+        urls[url] = (channel, cursor.get("last_id", 0))
+        headers[url] = conditional_headers(cursor)
+
+    pool = None
+    if parse_workers > 1:
+        pool = ProcessPoolExecutor(
+            parse_workers, mp_context=multiprocessing.get_context(PARSE_START_METHOD)
+        )
+    max_pending = max(parse_workers, 1) * PARSE_BACKLOG
+    pending = {}
+
+    def finish(future):
+        channel, after_id, response_headers = pending.pop(future)
+        items, last_id, elapsed = future.result()
+        PARSE_SECONDS.observe(elapsed)
+        if cursors is not None:
+            cursors.update(
+                channel,
+                last_id,
+                response_headers.get("ETag"),
+                response_headers.get("Last-Modified"),
+            )
+        if scores is not None:
+            new_posts = last_id - after_id if after_id else 0
+            scores.record_fetch(channel, ok=True, new_posts=new_posts)
+        return channel, items
+
+    try:
+        for url, response in fetch_all_responses(urls, headers=headers):
+            channel, after_id = urls[url]
+            if response is None:
+                if scores is not None:
+                    scores.record_fetch(channel, ok=False)
+                continue
+            CHANNEL_FETCH_SECONDS.labels(channel).inc(response.elapsed.total_seconds())
+            if response.status_code == 304:
+                if scores is not None:
+                    scores.record_fetch(channel, ok=True)
+                yield channel, []
+                continue
+            CHANNEL_BYTES.labels(channel).inc(len(response.content))
+
+            if pool is None:
+                future = Future()
+                future.set_result(_parse(parse_page, response.content, after_id))
+            else:
+                while len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for finished in done:
+                        yield finish(finished)
+                future = pool.submit(_parse, parse_page, response.content, after_id)
+            pending[future] = (channel, after_id, response.headers)
+
+            for finished in [f for f in pending if f.done()]:
+                yield finish(finished)
+
+        for finished in as_completed(list(pending)):
+            yield finish(finished)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
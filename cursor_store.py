@@ -0,0 +1,44 @@
+import os
+import json
+import threading
+
+
+CURSOR_FILE = os.environ.get("CURSOR_FILE", "cursors.json")
+
+
+class CursorStore:
+    # Per-channel crawl position: last seen message id plus the validators
+    # needed for conditional requests
+    def __init__(self, path=CURSOR_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.cursors = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.cursors = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error reading cursor store {path}: {e}")
+
+    def get(self, channel):
+        with self.lock:
+            return dict(self.cursors.get(channel, {}))
+
+    def update(self, channel, last_id=None, etag=None, last_modified=None):
+        with self.lock:
+            cursor = self.cursors.setdefault(channel, {})
+            if last_id:
+                cursor["last_id"] = max(last_id, cursor.get("last_id", 0))
+            if etag:
+                cursor["etag"] = etag
+            if last_modified:
+                cursor["last_modified"] = last_modified
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.cursors, indent=2, sort_keys=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,115 @@
+import os
+import time
+import asyncio
+import ipaddress
+import threading
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+from dns import rdatatype
+
+
+DNS_NAMESERVERS = [
+    server.strip()
+    for server in os.environ.get("DNS_NAMESERVERS", "8.8.8.8").split(",")
+    if server.strip()
+]
+DNS_TIMEOUT = float(os.environ.get("DNS_TIMEOUT", 3))
+# Used when an answer carries no TTL we can read (errors, empty answers)
+NEGATIVE_TTL = 60
+MIN_TTL = 30
+
+
+def is_ip(host):
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return True
+    except ValueError:
+        return False
+
+
+class DNSCache:
+    # Shared resolver: A and AAAA are queried concurrently and answers are
+    # cached until their TTL expires, including negative answers
+    def __init__(self, nameservers=None, timeout=DNS_TIMEOUT):
+        self.resolver = dns.asyncresolver.Resolver(configure=False)
+        self.resolver.nameservers = list(nameservers or DNS_NAMESERVERS)
+        self.resolver.lifetime = timeout
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.inflight = {}
+
+    def cached(self, host):
+        with self.lock:
+            entry = self.entries.get(host)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    async def _query(self, host, rdtype):
+        try:
+            answer = await self.resolver.resolve(host, rdtype, raise_on_no_answer=False)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoNameservers, dns.exception.Timeout):
+            return [], NEGATIVE_TTL
+        if answer.rrset is None:
+            return [], NEGATIVE_TTL
+        return [rdata.address for rdata in answer.rrset], answer.rrset.ttl
+
+    async def _lookup(self, host):
+        try:
+            (ipv4, ttl4), (ipv6, ttl6) = await asyncio.gather(
+                self._query(host, rdatatype.A), self._query(host, rdatatype.AAAA)
+            )
+            ips = ipv4 + ipv6
+            ttl = min(ttl4, ttl6) if ipv4 and ipv6 else (ttl4 if ipv4 else ttl6)
+            ttl = max(ttl, MIN_TTL) if ips else NEGATIVE_TTL
+        except Exception as e:
+            print(f"DNS lookup failed for {host}: {e}")
+            ips, ttl = [], NEGATIVE_TTL
+        with self.lock:
+            self.entries[host] = (ips, time.monotonic() + ttl)
+        return ips
+
+    async def resolve_async(self, host):
+        # Returns a list of addresses, IPv4 first; empty when the name does
+        # not resolve
+        host = host.strip("[]").lower()
+        if is_ip(host):
+            return [host]
+        ips = self.cached(host)
+        if ips is not None:
+            return ips
+        loop = asyncio.get_running_loop()
+        key = (id(loop), host)
+        task = self.inflight.get(key)
+        if task is None:
+            task = self.inflight[key] = loop.create_task(self._lookup(host))
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def resolve(self, host):
+        ips = self.cached(host.strip("[]").lower())
+        if ips is not None:
+            return ips
+        return asyncio.run(self.resolve_async(host))
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_resolver():
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = DNSCache()
+    return _default
+
+
+def resolve(host):
+    return get_resolver().resolve(host)
+
+
+async def resolve_async(host):
+    return await get_resolver().resolve_async(host)
@@ -0,0 +1,98 @@
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from metrics import FETCH_SECONDS, FETCH_ERRORS
+
+
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", 32))
+FETCH_TIMEOUT = float(os.environ.get("FETCH_TIMEOUT", 10))
+FETCH_RETRIES = int(os.environ.get("FETCH_RETRIES", 3))
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; TgProxBot/1.0)",
+    "Accept": "text/html",
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_size=FETCH_CONCURRENCY, retries=FETCH_RETRIES):
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+    )
+    # One keep-alive pool per host, sized so every worker can hold a connection
+    adapter = HTTPAdapter(
+        pool_connections=4, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def fetch_response(url, timeout=FETCH_TIMEOUT, headers=None):
+    # Returns the response (including 304 Not Modified) or None on failure
+    try:
+        with FETCH_SECONDS.time():
+            response = get_session().get(url, timeout=timeout, headers=headers)
+        response.raise_for_status()
+        return response
+    except Exception as e:
+        FETCH_ERRORS.inc()
+        print(f"Error fetching {url}: {e}")
+        return None
+
+
+def fetch(url, timeout=FETCH_TIMEOUT):
+    response = fetch_response(url, timeout)
+    return response.content if response is not None else None
+
+
+def fetch_all_responses(
+    urls, concurrency=FETCH_CONCURRENCY, timeout=FETCH_TIMEOUT, headers=None
+):
+    # Yields (url, response) as each request finishes; headers maps url to
+    # extra request headers such as If-None-Match. Only a window of requests
+    # is in flight ahead of the consumer, so a slow consumer slows fetching.
+    remaining = iter(list(urls))
+    headers = headers or {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = {}
+
+        def submit_next():
+            url = next(remaining, None)
+            if url is not None:
+                pending[pool.submit(fetch_response, url, timeout, headers.get(url))] = url
+
+        for _ in range(concurrency * 2):
+            submit_next()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = pending.pop(future)
+                yield url, future.result()
+                submit_next()
+
+
+def fetch_all(urls, concurrency=FETCH_CONCURRENCY, timeout=FETCH_TIMEOUT):
+    # Yields (url, content) as each page finishes; content is None on failure
+    for url, response in fetch_all_responses(urls, concurrency, timeout):
+        yield url, response.content if response is not None else None
@@ -1,9 +1,14 @@
+import os
 import html
+import asyncio
 import socket
 import ipaddress
+import threading
+from functools import lru_cache
 import geoip2
-from dns import resolver, rdatatype
 import geoip2.database
+from maxminddb import MODE_MMAP
+from dns_cache import resolve, resolve_async
 
 
 def is_valid_ip_address(ip):
@@ -20,40 +25,31 @@ def is_valid_ip_address(ip):
 
 
 def get_ips(node):
-    try:
-        res = resolver.Resolver()
-        res.nameservers = ["8.8.8.8"]
+    # Resolved through the shared caching resolver; empty set if unresolvable
+    return set(resolve(node))
 
-        # Retrieve IPV4 and IPV6
-        answers_ipv4 = res.resolve(node, rdatatype.A, raise_on_no_answer=False)
-        answers_ipv6 = res.resolve(node, rdatatype.AAAA, raise_on_no_answer=False)
 
-        # Initialize set for IPV4 and IPV6
-        ips = set()
+GEOIP_DATABASE = os.environ.get("GEOIP_DATABASE", "geoip-lite-country.mmdb")
 
-        # Append IPV4 and IPV6 into set
-        for rdata in answers_ipv4:
-            ips.add(rdata.address)
+_reader = None
+_reader_lock = threading.Lock()
 
-        for rdata in answers_ipv6:
-            ips.add(rdata.address)
 
-        return ips
-    except Exception:
-        return "127.0.0.1"
+def get_reader():
+    # One memory-mapped reader shared by the whole process
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                _reader = geoip2.database.Reader(GEOIP_DATABASE, mode=MODE_MMAP)
+    return _reader
 
 
-def get_country_from_ip(ip):
-    if not is_valid_ip_address(ip):
-        try:
-            ips_list = list(get_ips(ip))
-            ip = ips_list[0]
-        except Exception:
-            ip = "127.0.0.1"
+@lru_cache(maxsize=65536)
+def lookup_country_code(ip):
     try:
-        with geoip2.database.Reader("geoip-lite-country.mmdb") as reader:
-            response = reader.country(ip)
-            country_code = response.country.iso_code
+        response = get_reader().country(ip)
+        country_code = response.country.iso_code
         if country_code:
             return country_code
         else:
@@ -63,6 +59,16 @@ def get_country_from_ip(ip):
         return "NA"
 
 
+def get_country_from_ip(ip):
+    if not is_valid_ip_address(ip):
+        try:
+            ips_list = list(get_ips(ip))
+            ip = ips_list[0]
+        except Exception:
+            ip = "127.0.0.1"
+    return lookup_country_code(ip.strip("[]"))
+
+
 def get_country_flag(country_code):
     if country_code == "NA":
         return html.unescape("\U0001f3f4\u200d\u2620\ufe0f")
@@ -76,3 +82,26 @@ def get_country(address):
     country_code = get_country_from_ip(address)
     flag = get_country_flag(country_code)
     return flag
+
+
+async def get_countries_async(addresses):
+    # Maps each distinct address (IP or hostname) to its country code. All
+    # hostnames are resolved concurrently, then looked up in one pass.
+    addresses = set(addresses)
+    hostnames = [address for address in addresses if not is_valid_ip_address(address)]
+    resolved = await asyncio.gather(
+        *(resolve_async(hostname) for hostname in hostnames), return_exceptions=True
+    )
+    ips = {address: address.strip("[]") for address in addresses}
+    for hostname, result in zip(hostnames, resolved):
+        # Unresolvable names map to "NA", as in get_country_from_ip
+        if isinstance(result, BaseException) or not result:
+            ips[hostname] = "127.0.0.1"
+        else:
+            ips[hostname] = result[0]
+    return {address: lookup_country_code(ip) for address, ip in ips.items()}
+
+
+def get_countries(addresses):
+    # Blocking form of get_countries_async, for callers without an event loop
+    return asyncio.run(get_countries_async(addresses))
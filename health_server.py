@@ -1,13 +1,42 @@
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import threading
 import json
+import metrics
+import readiness
 
 class HealthHandler(BaseHTTPRequestHandler):
     def do_GET(self):
-        self.send_response(200)
+        if self.path == '/metrics':
+            self.send_metrics(200, metrics.render())
+            return
+        if self.path == '/metrics/pipeline':
+            # Last export of the collection job, when it runs on this host
+            body = metrics.read_textfile(metrics.PIPELINE_METRICS_FILE)
+            self.send_metrics(404 if body is None else 200, body or "")
+            return
+        if self.path == '/livez':
+            self.send_json(200, {"status": "alive"})
+            return
+        if self.path == '/readyz':
+            ready = readiness.is_ready()
+            body = {"status": "ready" if ready else "warming", "components": readiness.status()}
+            self.send_json(200 if ready else 503, body)
+            return
+        self.send_json(200, {"status": "healthy"})
+
+    def send_metrics(self, status, text):
+        body = text.encode()
+        self.send_response(status)
+        self.send_header('Content-type', metrics.CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, body):
+        self.send_response(status)
         self.send_header('Content-type', 'application/json')
         self.end_headers()
-        self.wfile.write(json.dumps({"status": "healthy"}).encode())
+        self.wfile.write(json.dumps(body).encode())
     
     def log_message(self, format, *args):
         pass  # Suppress HTTP logs
@@ -16,7 +45,8 @@ def start_health_server():
     import os
     port = int(os.environ.get('PORT', 8080))
     try:
-        server = HTTPServer(('0.0.0.0', port), HealthHandler)
+        server = ThreadingHTTPServer(('0.0.0.0', port), HealthHandler)
+        server.daemon_threads = True
         thread = threading.Thread(target=server.serve_forever, daemon=True)
         thread.start()
         print(f"Health server started on 0.0.0.0:{port}")
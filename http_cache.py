@@ -0,0 +1,58 @@
+import gzip
+import hashlib
+
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 256
+
+
+class EncodedBody:
+    # One response body, pre-compressed in every encoding the server offers,
+    # with a strong ETag per representation
+    __slots__ = ("bodies", "etags")
+
+    def __init__(self, body):
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.bodies = {"identity": body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.bodies["gzip"] = gzip.compress(body, compresslevel=6, mtime=0)
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(body, quality=5)
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            for encoding in self.bodies
+        }
+
+    def select(self, accept_encoding):
+        # Returns (encoding, body, etag) for the best encoding the client accepts
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.bodies and encoding in accepted:
+                return encoding, self.bodies[encoding], self.etags[encoding]
+        return "identity", self.bodies["identity"], self.etags["identity"]
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            accepted.add(name.lower())
+    return accepted
+
+
+def etag_matches(if_none_match, etag):
+    # Weak comparison, as If-None-Match requires (RFC 9110 13.1.2)
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
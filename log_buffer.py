@@ -0,0 +1,77 @@
+import os
+import logging
+import threading
+from collections import deque
+
+
+class RingBufferHandler(logging.Handler):
+    # Keeps the last `capacity` formatted records in memory
+    def __init__(self, capacity=500, level=logging.NOTSET):
+        super().__init__(level)
+        self.buffer = deque(maxlen=capacity)
+        self.buffer_lock = threading.Lock()
+
+    def emit(self, record):
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self.buffer_lock:
+            self.buffer.append((record.levelno, line))
+
+    def records(self, limit=10, min_level=logging.NOTSET):
+        # Most recent `limit` lines at or above min_level, oldest first
+        with self.buffer_lock:
+            entries = list(self.buffer)
+        lines = [line for levelno, line in entries if levelno >= min_level]
+        return lines[-limit:] if limit else []
+
+
+def tail_lines(path, limit, block_size=8192):
+    # Last `limit` lines of a file, read backwards from the end in blocks
+    if limit <= 0:
+        return []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= limit:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+    lines = data.decode("utf-8", "replace").splitlines()
+    return lines[-limit:]
+
+
+def read_history(path, limit, backups=2, min_level=None):
+    # Walks bot.log, bot.log.1, ... newest first until `limit` lines are found.
+    # min_level filters on the "- LEVEL -" field of the standard format.
+    levels = None
+    if min_level:
+        levels = {
+            logging.getLevelName(level)
+            for level in (logging.DEBUG, logging.INFO, logging.WARNING,
+                          logging.ERROR, logging.CRITICAL)
+            if level >= min_level
+        }
+    collected = []
+    for index in range(backups + 1):
+        file_path = path if index == 0 else f"{path}.{index}"
+        if not os.path.exists(file_path):
+            continue
+        wanted = limit - len(collected)
+        # Filtering drops lines, so read more than needed from each file
+        lines = tail_lines(file_path, wanted if levels is None else wanted * 20)
+        if levels is not None:
+            lines = [line for line in lines if _line_level(line) in levels]
+        collected = lines[-wanted:] + collected
+        if len(collected) >= limit:
+            break
+    return collected[-limit:]
+
+
+def _line_level(line):
+    parts = line.split(" - ", 3)
+    return parts[2] if len(parts) > 2 else None
@@ -0,0 +1,274 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+        if not self.labelnames:
+            self.children[()] = self._new_child()
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self.lock:
+            children = list(self.children.items())
+        for values, child in children:
+            lines.extend(self._sample_lines(values, child))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.children[()].inc(amount)
+
+    def _sample_lines(self, values, child):
+        labels = _labels_text(self.labelnames, values)
+        return [f"{self.name}{labels} {child.value}"]
+
+
+class _GaugeChild:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def set(self, value):
+        with self.lock:
+            self.value = value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self.children[()].set(value)
+
+    def _sample_lines(self, values, child):
+        labels = _labels_text(self.labelnames, values)
+        return [f"{self.name}{labels} {child.value}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.children[()].observe(value)
+
+    def time(self):
+        return self.children[()].time()
+
+    def _sample_lines(self, values, child):
+        with child.lock:
+            counts = list(child.counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(float(bound))
+            labels = _labels_text(self.labelnames, values, f'le="{le}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _labels_text(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def render():
+    return REGISTRY.render()
+
+
+# Where the one-shot collection job leaves its metrics. It exits before
+# anything can scrape it, so the file is the export: point node_exporter's
+# textfile collector at it, or scrape /metrics/pipeline on web_app/bot when
+# they run on the same host.
+PIPELINE_METRICS_FILE = os.environ.get("PIPELINE_METRICS_FILE", "pipeline_metrics.prom")
+
+
+def write_textfile(path):
+    # Replaced atomically so a reader never sees a half-written file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+def read_textfile(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+# Metrics shared across modules. Each process only exports what it records:
+#   collection job (python pipeline.py -> PIPELINE_METRICS_FILE): fetch,
+#     channel, parse, probe and probe cache series, the Supabase upsert and
+#     delete latency of its writes, and the last successful run
+#   bot and web_app (/metrics): handler and Telegram send series, Supabase
+#     read latency, and on the leader the probe and Supabase series of
+#     revalidation
+FETCH_SECONDS = histogram("tgprox_fetch_seconds", "Channel page fetch latency")
+FETCH_ERRORS = counter("tgprox_fetch_errors_total", "Channel page fetch failures")
+CHANNEL_BYTES = counter(
+    "tgprox_channel_bytes_total", "Bytes downloaded per channel", ["channel"]
+)
+CHANNEL_FETCH_SECONDS = counter(
+    "tgprox_channel_fetch_seconds_total", "Fetch time spent per channel", ["channel"]
+)
+PARSE_SECONDS = histogram(
+    "tgprox_parse_seconds", "Channel page parse time",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+PROBE_SECONDS = histogram("tgprox_probe_rtt_seconds", "TCP connect RTT of successful probes")
+PROBES = counter("tgprox_probes_total", "Endpoint probes by outcome", ["result"])
+PROBE_CACHE = counter(
+    "tgprox_probe_cache_total", "Probe cache lookups (hit, miss, merged)", ["result"]
+)
+SUPABASE_SECONDS = histogram(
+    "tgprox_supabase_seconds", "Supabase request latency", ["operation"]
+)
+TELEGRAM_SEND_SECONDS = histogram(
+    "tgprox_telegram_send_seconds", "Telegram sendMessage latency"
+)
+TELEGRAM_429 = counter(
+    "tgprox_telegram_429_total", "Telegram rate limit (429) responses"
+)
+HANDLER_SECONDS = histogram(
+    "tgprox_handler_seconds", "Bot handler latency", ["handler"]
+)
+COLLECTION_LAST_SUCCESS = gauge(
+    "tgprox_collection_last_success_timestamp_seconds",
+    "Unix time the last collection run finished",
+)
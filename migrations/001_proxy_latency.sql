@@ -0,0 +1,7 @@
+-- Connect RTT and last successful probe time, recorded by the collectors
+alter table proxies add column if not exists latency_ms integer;
+alter table proxies add column if not exists last_success timestamptz;
+
+-- get_proxies orders by fastest first, then most recently verified
+create index if not exists proxies_latency_last_success_idx
+    on proxies (latency_ms asc nulls last, last_success desc nulls last);
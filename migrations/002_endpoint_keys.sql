@@ -0,0 +1,12 @@
+-- Collector writes are upserts keyed by canonical endpoint (see canonical.py)
+alter table proxies add column if not exists endpoint_key text;
+alter table proxies add column if not exists updated_at timestamptz not null default now();
+create unique index if not exists proxies_endpoint_key_idx on proxies (endpoint_key);
+create index if not exists proxies_updated_at_idx on proxies (updated_at);
+
+alter table configs add column if not exists endpoint_key text;
+alter table configs add column if not exists latency_ms integer;
+alter table configs add column if not exists last_success timestamptz;
+alter table configs add column if not exists updated_at timestamptz not null default now();
+create unique index if not exists configs_endpoint_key_idx on configs (endpoint_key);
+create index if not exists configs_updated_at_idx on configs (updated_at);
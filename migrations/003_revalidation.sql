@@ -0,0 +1,8 @@
+-- Bookkeeping for continuous revalidation (see revalidator.py)
+alter table proxies add column if not exists last_checked timestamptz;
+alter table proxies add column if not exists fail_count integer not null default 0;
+create index if not exists proxies_last_checked_idx on proxies (last_checked asc nulls first);
+
+alter table configs add column if not exists last_checked timestamptz;
+alter table configs add column if not exists fail_count integer not null default 0;
+create index if not exists configs_last_checked_idx on configs (last_checked asc nulls first);
@@ -0,0 +1,26 @@
+-- Leader lease shared by all replicas (see coordination.SupabaseLeaderLock)
+create table if not exists leader_leases (
+    name text primary key,
+    holder text not null,
+    expires_at timestamptz not null
+);
+
+-- Takes or renews the lease in one statement: succeeds when the lease is
+-- free, expired or already held by p_holder. Uses the database clock so
+-- replicas with skewed clocks agree on expiry.
+create or replace function try_acquire_lease(p_name text, p_holder text, p_lease_seconds integer)
+returns boolean
+language plpgsql
+as $$
+declare
+    current_holder text;
+begin
+    insert into leader_leases as l (name, holder, expires_at)
+    values (p_name, p_holder, now() + make_interval(secs => p_lease_seconds))
+    on conflict (name) do update
+        set holder = excluded.holder, expires_at = excluded.expires_at
+        where l.holder = excluded.holder or l.expires_at < now();
+    select holder into current_holder from leader_leases where name = p_name;
+    return current_holder = p_holder;
+end;
+$$;
@@ -1,29 +1,18 @@
+import asyncio
 import socket
-import base64
-import json
+from dns_cache import resolve, resolve_async
+from metrics import PROBES, PROBE_SECONDS, PROBE_CACHE
+from probe_cache import ProbeCache
+from uri_parser import try_parse
 
 
 def get_ip_and_port(url):
-    try:
-        if url.startswith(("vless", "trojan")):
-            config = url.split("@")[1].split("?")[0]
-            ip, port = config.split(":")
-
-        elif url.startswith("https://t.me"):
-            ip = url.split("=")[1].split("&")[0]
-            port = url.split("=")[2].split("&")[0]
-
-        elif url.startswith("ss"):
-            config = url.split("@")[1].split("#")[0]
-            ip, port = config.split(":")
-        elif url.startswith("vmess"):
-            config = json.loads(base64.b64decode(url[8:]).decode("utf-8"))
-            ip, port = config["add"], config["port"]
-        else:
-            return False, False
-        return ip, port
-    except Exception:
-        return "127.0.0.1", "8080"
+    # (host, port) of a proxy/config link, or (False, False) if it cannot be
+    # parsed, so malformed links are never probed
+    endpoint = try_parse(url)
+    if endpoint is None:
+        return False, False
+    return endpoint.host, endpoint.port
 
 
 def ping(url):
@@ -31,7 +20,10 @@ def ping(url):
         ip, port = get_ip_and_port(url)
 
         if ip and port:
-            sock = socket.create_connection((ip, port), timeout=3)
+            addresses = resolve(ip)
+            if not addresses:
+                return False
+            sock = socket.create_connection((addresses[0], port), timeout=3)
             sock.close()
             return True
         else:
@@ -39,3 +31,119 @@ def ping(url):
 
     except Exception:
         return False
+
+
+PROBE_CONCURRENCY = 500
+PROBE_TIMEOUT = 3
+PROBE_DEADLINE = 300
+
+
+async def _probe(url, semaphore, timeout, inflight, cache=None):
+    # Links that resolve to the same (address, port) share one connection
+    # attempt: in-flight attempts are joined, finished ones come from cache
+    ip, port = get_ip_and_port(url)
+    if not (ip and port):
+        return url, None
+    async with semaphore:
+        try:
+            addresses = await asyncio.wait_for(resolve_async(ip), timeout)
+        except Exception:
+            return url, None
+    if not addresses:
+        return url, None
+    key = ProbeCache.key(addresses[0], port)
+    if cache is not None:
+        hit, rtt = cache.lookup(key)
+        if hit:
+            PROBE_CACHE.labels("hit").inc()
+            return url, rtt
+    task = inflight.get(key)
+    if task is None:
+        PROBE_CACHE.labels("miss").inc()
+        task = inflight[key] = asyncio.ensure_future(
+            _connect(addresses[0], port, semaphore, timeout)
+        )
+        if cache is not None:
+            task.add_done_callback(lambda done: _store(cache, key, done))
+    else:
+        PROBE_CACHE.labels("merged").inc()
+    # Shielded so a cancelled waiter does not cancel the shared attempt
+    return url, await asyncio.shield(task)
+
+
+def _store(cache, key, task):
+    if not task.cancelled() and task.exception() is None:
+        cache.store(key, task.result())
+
+
+async def _connect(address, port, semaphore, timeout):
+    async with semaphore:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(address, int(port)), timeout
+            )
+        except Exception:
+            PROBES.labels("fail").inc()
+            return None
+        rtt = (loop.time() - start) * 1000
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+    PROBES.labels("ok").inc()
+    PROBE_SECONDS.observe(rtt / 1000)
+    return rtt
+
+
+async def probe_stream(
+    urls, concurrency=PROBE_CONCURRENCY, timeout=PROBE_TIMEOUT, deadline=PROBE_DEADLINE,
+    cache=None,
+):
+    # Async generator of (url, rtt_ms) in completion order; rtt_ms is None when
+    # the endpoint is unreachable or the overall deadline expired first. With
+    # a ProbeCache, recently probed endpoints are answered without connecting.
+    urls = list(urls)
+    semaphore = asyncio.Semaphore(concurrency)
+    inflight = {}
+    tasks = [
+        asyncio.ensure_future(_probe(url, semaphore, timeout, inflight, cache))
+        for url in urls
+    ]
+    pending = {task: url for task, url in zip(tasks, urls)}
+    loop = asyncio.get_running_loop()
+    end = loop.time() + deadline
+    try:
+        while pending:
+            remaining = end - loop.time()
+            if remaining <= 0:
+                break
+            done, _ = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                pending.pop(task)
+                yield task.result()
+    finally:
+        for task in list(pending) + list(inflight.values()):
+            task.cancel()
+        await asyncio.gather(*pending, *inflight.values(), return_exceptions=True)
+    for url in pending.values():
+        yield url, None
+
+
+def ping_many(urls, **kwargs):
+    # Synchronous wrapper around probe_stream that streams results as they finish
+    loop = asyncio.new_event_loop()
+    stream = probe_stream(urls, **kwargs)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(stream.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(stream.aclose())
+        loop.close()
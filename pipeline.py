@@ -0,0 +1,44 @@
+import os
+import time
+import metrics
+from datetime import timedelta
+from proxy_collector import collect_proxy_rows
+from config_collector import collect_config_rows
+from supabase_db import upsert_proxies, upsert_configs, delete_stale
+from cursor_store import CursorStore
+
+
+STALE_AFTER = timedelta(hours=int(os.environ.get("STALE_AFTER_HOURS", 24)))
+
+
+def collect_and_store(collect, upsert):
+    # Cursors are saved only after the rows collected past them are stored.
+    # If the upsert fails they stay where they were, so the next cycle reads
+    # the same posts again instead of skipping them.
+    cursors = CursorStore()
+    written = upsert(collect(cursors))
+    if written is None:
+        print("Upsert failed, channel cursors not advanced")
+        return 0
+    cursors.save()
+    return written
+
+
+def run_collection():
+    # One collection cycle: collect, upsert in batches, then drop rows that
+    # have not been refreshed for STALE_AFTER
+    proxies = collect_and_store(collect_proxy_rows, upsert_proxies)
+    configs = collect_and_store(collect_config_rows, upsert_configs)
+    delete_stale("proxies", STALE_AFTER)
+    delete_stale("configs", STALE_AFTER)
+    print(f"Stored {proxies} proxies and {configs} configs")
+    metrics.COLLECTION_LAST_SUCCESS.set(time.time())
+    return proxies, configs
+
+
+if __name__ == "__main__":
+    try:
+        run_collection()
+    finally:
+        # Exported on every exit, so failed runs show up too
+        metrics.write_textfile(metrics.PIPELINE_METRICS_FILE)
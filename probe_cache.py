@@ -0,0 +1,81 @@
+import os
+import json
+import time
+import threading
+
+
+PROBE_CACHE_FILE = os.environ.get("PROBE_CACHE_FILE", "probe_cache.json")
+# Reachable endpoints are trusted for longer than unreachable ones, so a
+# host that comes back is retried soon
+POSITIVE_TTL = int(os.environ.get("PROBE_CACHE_TTL", 900))
+NEGATIVE_TTL = int(os.environ.get("PROBE_CACHE_NEGATIVE_TTL", 300))
+
+
+class ProbeCache:
+    # Probe results keyed by resolved (address, port), so every link pointing
+    # at the same endpoint shares one probe. Persisted between collection
+    # cycles, which may run in separate processes.
+    def __init__(self, path=PROBE_CACHE_FILE, positive_ttl=POSITIVE_TTL, negative_ttl=NEGATIVE_TTL):
+        self.path = path
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            now = time.time()
+            self.entries = {
+                key: (rtt, expires)
+                for key, (rtt, expires) in stored.items()
+                if expires > now
+            }
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error reading probe cache {self.path}: {e}")
+
+    @staticmethod
+    def key(address, port):
+        return f"{address}|{port}"
+
+    def lookup(self, key, now=None):
+        # (True, rtt_ms or None) for a live entry, (False, None) on a miss
+        now = now or time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None or entry[1] <= now:
+            return False, None
+        return True, entry[0]
+
+    def store(self, key, rtt, now=None):
+        now = now or time.time()
+        ttl = self.positive_ttl if rtt is not None else self.negative_ttl
+        with self.lock:
+            self.entries[key] = (rtt, now + ttl)
+
+    def save(self):
+        now = time.time()
+        with self.lock:
+            self.entries = {
+                key: entry for key, entry in self.entries.items() if entry[1] > now
+            }
+            data = json.dumps(self.entries, sort_keys=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_probe_cache():
+    # Process-wide cache, loaded from disk on first use
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ProbeCache()
+    return _cache
@@ -1,7 +1,15 @@
-from bs4 import BeautifulSoup
-import requests
 import json
-from pinger import ping
+from datetime import datetime, timezone
+from pinger import ping_many
+from probe_cache import get_probe_cache
+from fetcher import fetch
+from crawler import crawl
+from tme_parser import extract_messages
+from cursor_store import CursorStore
+from canonical import DedupIndex
+from uri_parser import try_parse, mtproto_link
+from channel_scores import ChannelScores, record_cycle
+from coordination import shard
 
 
 def read_db():
@@ -11,57 +19,82 @@ def read_db():
             database = json.loads(database)
             return database
     except Exception:
+        default_db = {"proxy_channels": [], "config_channels": []}
         with open("setting.json", "w") as json_file:
-            default_db = {"proxy_channels": [], "config_channels": []}
-        default_db = json.dumps(default_db, indent=2, sort_keys=True)
-        json_file.write(default_db)
+            json_file.write(json.dumps(default_db, indent=2, sort_keys=True))
         return default_db
 
 
-db = read_db()
+def get_messages(channel_link):
+    content = fetch(channel_link)
+    if content is None:
+        return []
+    return parse_messages(content)
 
 
-def get_messages(channel_link):
+def parse_messages(content):
+    return parse_page(content)[0]
+
+
+def parse_page(content, after_id=0):
+    messages = extract_messages(content, after_id)
+    last_id = max([after_id] + [message.id for message in messages])
+
+    # First crawl of a channel only looks at the most recent posts
+    if not after_id:
+        messages = messages[-4:]
+
     proxies = []
-    request = requests.get(channel_link).content
-    document = BeautifulSoup(request, "html.parser")
-
-    final_text = document.find_all(
-        "div", class_="tgme_widget_message_text js-message_text"
-    )
-
-    for message in final_text[-4:]:
-        links = message.find_all("a")
-        for link in links:
-            href = link.get("href")
-            if href and "proxy" in href:
+    for message in messages:
+        for href in message.links:
+            if "proxy" in href:
                 proxies.append(href)
 
-    return proxies
+    return proxies, last_id
 
 
-def collect_proxies():
-    links = []
-    for channel_name in db["proxy_channels"]:
-        link = "https://t.me/s/" + channel_name
-        links.append(link)
+def collect_proxy_rows(cursors=None):
+    # cursors is advanced but not saved; see pipeline.run_collection
+    if cursors is None:
+        cursors = CursorStore()
+    scores = ChannelScores("proxies")
+    # Read per cycle rather than at import, so channel edits apply without a
+    # restart; with several workers each crawls only its own shard
+    channels = scores.due(shard(read_db()["proxy_channels"]))
     proxies = []
-    for link in links:
-        proxies.extend(get_messages(link))
+    found_by_channel = {}
+    for channel, found in crawl(channels, parse_page, cursors, scores):
+        proxies.extend(found)
+        found_by_channel[channel] = found
 
-    for proxy in proxies:
-        is_working = ping(proxy)
-        if not is_working:
-            proxies.remove(proxy)
+    dedup = DedupIndex("proxies")
+    proxies = dedup.dedupe(proxies)
+    dedup.save()
+
+    probe_cache = get_probe_cache()
+    latencies = {
+        proxy: rtt for proxy, rtt in ping_many(proxies, cache=probe_cache) if rtt is not None
+    }
+    probe_cache.save()
+    record_cycle(scores, found_by_channel, dedup.new_keys, latencies)
+    checked_at = datetime.now(timezone.utc).isoformat()
 
-    index = 0
+    rows = []
     for proxy in proxies:
-        server = proxy.split("=")[1].split("&")[0]
-        port = int(proxy.split("=")[2].split("&")[0])
-        secret = proxy.split("=")[3]
-        tgprox = f"tg://proxy?server={server}&port={port}&secret={secret}"
-        proxies[index] = tgprox
-        index += 1
-
-    print(f"{index +1} Proxies Collected Successfully")
-    return proxies
+        endpoint = try_parse(proxy)
+        if proxy not in latencies or endpoint is None or endpoint.protocol != "mtproto":
+            continue
+        rows.append(
+            {
+                "url": mtproto_link(endpoint),
+                "latency_ms": round(latencies[proxy]),
+                "last_success": checked_at,
+            }
+        )
+
+    print(f"{len(rows)} Proxies Collected Successfully")
+    return rows
+
+
+def collect_proxies():
+    return [row["url"] for row in collect_proxy_rows()]
@@ -0,0 +1,54 @@
+import time
+import threading
+
+
+# Seconds between warm-up attempts of a component that is not ready yet
+RETRY_SECONDS = 5
+
+_lock = threading.Lock()
+_components = {}
+
+
+def register(*names):
+    # Components must all be marked ready before the process reports ready
+    with _lock:
+        for name in names:
+            _components.setdefault(name, False)
+
+
+def mark_ready(name, ready=True):
+    with _lock:
+        _components[name] = ready
+
+
+def is_ready():
+    with _lock:
+        return bool(_components) and all(_components.values())
+
+
+def status():
+    with _lock:
+        return dict(_components)
+
+
+def _run(steps, retry_seconds):
+    for name, step in steps:
+        while True:
+            try:
+                step()
+                break
+            except Exception as e:
+                print(f"Warm-up of {name} failed, retrying in {retry_seconds}s: {e}")
+                time.sleep(retry_seconds)
+        mark_ready(name)
+        print(f"Warm-up: {name} ready")
+
+
+def warm_up(steps, retry_seconds=RETRY_SECONDS):
+    # Runs (name, func) steps in order on a background thread, retrying each
+    # until it stops raising, so the server can bind its port immediately
+    # and report ready only once everything is loaded
+    register(*(name for name, _ in steps))
+    thread = threading.Thread(target=_run, args=(steps, retry_seconds), daemon=True)
+    thread.start()
+    return thread
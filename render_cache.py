@@ -0,0 +1,26 @@
+import threading
+
+
+class RenderCache:
+    # Rendered payloads for one data generation. Everything is dropped as soon
+    # as a newer generation is seen, so entries never outlive their data.
+    def __init__(self, generation_func, max_entries=256):
+        self.generation_func = generation_func
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.generation = None
+        self.entries = {}
+
+    def get(self, key, render):
+        generation = self.generation_func()
+        with self.lock:
+            if generation != self.generation:
+                self.generation = generation
+                self.entries = {}
+            value = self.entries.get(key)
+        if value is None:
+            value = render()
+            with self.lock:
+                if generation == self.generation and len(self.entries) < self.max_entries:
+                    self.entries[key] = value
+        return value
@@ -0,0 +1,72 @@
+import os
+from datetime import datetime, timezone
+from pinger import ping_many
+from supabase_db import (
+    take_served, load_revalidation_batch, save_probe_results, delete_endpoints,
+)
+
+
+REVALIDATE_BATCH = int(os.environ.get("REVALIDATE_BATCH", 100))
+REVALIDATE_SECONDS = int(os.environ.get("REVALIDATE_SECONDS", 60))
+# Consecutive failed probes before a row is evicted
+MAX_FAILURES = int(os.environ.get("REVALIDATE_MAX_FAILURES", 3))
+PROBE_TIMEOUT = 3
+
+TABLES = (("proxies", "url"), ("configs", "config"))
+
+
+def revalidate(table, link_column, batch_size=REVALIDATE_BATCH, priority_links=()):
+    # Re-probes one batch of stored rows. Live rows get a fresh latency and
+    # their failure count reset; dead rows are demoted (latency cleared so
+    # they rank last) and evicted after MAX_FAILURES consecutive failures.
+    rows = load_revalidation_batch(table, link_column, batch_size, priority_links)
+    if not rows:
+        return 0, 0
+    links = [row[link_column] for row in rows]
+    latencies = dict(ping_many(links, timeout=PROBE_TIMEOUT, deadline=PROBE_TIMEOUT * 2))
+    now = datetime.now(timezone.utc).isoformat()
+
+    # Bulk upserts need the same columns in every row, so live and dead rows
+    # are written separately
+    alive = []
+    dead = []
+    evicted = []
+    for row in rows:
+        rtt = latencies.get(row[link_column])
+        update = {
+            link_column: row[link_column],
+            "endpoint_key": row["endpoint_key"],
+            "last_checked": now,
+        }
+        if rtt is not None:
+            # updated_at is what delete_stale expires on, so a row that keeps
+            # passing revalidation must refresh it too
+            update.update(latency_ms=round(rtt), last_success=now, updated_at=now, fail_count=0)
+            alive.append(update)
+        else:
+            failures = (row.get("fail_count") or 0) + 1
+            if failures >= MAX_FAILURES:
+                evicted.append(row["endpoint_key"])
+                continue
+            update.update(latency_ms=None, fail_count=failures)
+            dead.append(update)
+
+    save_probe_results(table, alive)
+    save_probe_results(table, dead)
+    delete_endpoints(table, evicted)
+    return len(rows), len(evicted)
+
+
+def run_once():
+    # One revalidation tick: a fixed-size batch per table, so the probe load
+    # stays constant no matter how large the tables grow
+    priority = {"proxies": take_served(REVALIDATE_BATCH // 2)}
+    for table, link_column in TABLES:
+        try:
+            checked, evicted = revalidate(
+                table, link_column, priority_links=priority.get(table, ())
+            )
+            if checked:
+                print(f"Revalidated {checked} {table}, evicted {evicted}")
+        except Exception as e:
+            print(f"Revalidation of {table} failed: {e}")
@@ -1,6 +1,12 @@
 import os
-from supabase import create_client, Client
+import random
+import threading
+from collections import Counter
+from datetime import datetime, timezone
 from dotenv import load_dotenv
+from cache import SWRCache
+from canonical import canonical_key, key_string
+from metrics import SUPABASE_SECONDS
 
 load_dotenv()
 
@@ -9,37 +15,294 @@ proxy_vars = ['http_proxy', 'https_proxy', 'HTTP_PROXY', 'HTTPS_PROXY', 'ALL_PRO
 for proxy_var in proxy_vars:
     os.environ.pop(proxy_var, None)
 
-url = os.environ["URL"]
-key = os.environ["KEY"]
+# The client is created on first use: importing supabase (httpx, pydantic,
+# gotrue...) dominates startup time, and web_app/bot only need it once a
+# request actually reads the database
+_client = None
+_client_lock = threading.Lock()
 
-try:
-    supabase: Client = create_client(url, key)
-except Exception as e:
-    print(f"Supabase connection error: {e}")
-    supabase = None
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                try:
+                    from supabase import create_client
+                    _client = create_client(os.environ["URL"], os.environ["KEY"])
+                except Exception as e:
+                    print(f"Supabase connection error: {e}")
+    return _client
+
+# Proxies whose RTT falls in the same bucket are treated as equally good
+LATENCY_TIER_MS = 50
+CANDIDATE_FACTOR = 3
+
+# Each generation of the proxy set has this many distinct rotations, so the
+# rendered messages for them can be cached
+ROTATION_SLOTS = 8
+
+def rank_proxies(rows, limit, seed=None):
+    shuffler = random.Random(seed)
+    tiers = {}
+    for row in rows:
+        latency = row.get('latency_ms')
+        tier = latency // LATENCY_TIER_MS if latency is not None else float('inf')
+        tiers.setdefault(tier, []).append(row['url'])
+    ranked = []
+    for tier in sorted(tiers):
+        # Sorted first so the same seed gives the same order whatever order
+        # the rows came in
+        urls = sorted(tiers[tier])
+        shuffler.shuffle(urls)
+        ranked.extend(urls)
+    return ranked[:limit]
+
+# Largest candidate pool any caller needs (web_app caps count at 50)
+PROXY_POOL_SIZE = 50 * CANDIDATE_FACTOR
+
+# Writes below expire the cached reads instead of dropping them, so readers
+# keep the previous data while it reloads in the background
+cache = SWRCache(ttl=int(os.environ.get("CACHE_TTL", 60)))
+
+# How often each proxy was handed out since the last revalidation pass
+served = Counter()
+served_lock = threading.Lock()
+
+def _load_proxy_rows():
+    with SUPABASE_SECONDS.labels('select_proxies').time():
+        response = (
+            get_client().table('proxies')
+            .select('url, latency_ms, last_success')
+            .order('latency_ms', nullsfirst=False)
+            .order('last_success', desc=True, nullsfirst=False)
+            .limit(PROXY_POOL_SIZE)
+            .execute()
+        )
+    return response.data
+
+def _load_configs(limit):
+    with SUPABASE_SECONDS.labels('select_configs').time():
+        response = get_client().table('configs').select('*').limit(limit).execute()
+    configs = []
+    for row in response.data:
+        if 'config' in row and row['config']:
+            configs.append(row['config'])
+        elif 'url' in row and row['url']:
+            configs.append(row['url'])
+    return configs
 
 def get_proxies(limit=50):
-    if not supabase:
+    if not get_client():
         return []
     try:
-        response = supabase.table('proxies').select('url').limit(limit).execute()
-        return [row['url'] for row in response.data]
+        rows = cache.get('proxies', _load_proxy_rows)
+        seed = proxies_generation() * ROTATION_SLOTS + random.randrange(ROTATION_SLOTS)
+        proxies = rank_proxies(rows[:limit * CANDIDATE_FACTOR], limit, seed)
+        mark_served(proxies)
+        return proxies
     except Exception as e:
         print(f"Error fetching proxies: {e}")
         return []
 
+# (cache generation, snapshot generation, ranked pool) of the last snapshot.
+# The snapshot generation only changes when the ranked URLs do, not when a
+# revalidation pass rewrites latency_ms/last_success of the same proxies.
+_snapshot = (None, 0, [])
+_snapshot_lock = threading.Lock()
+
+def get_proxy_snapshot():
+    # The whole cached pool in one fixed order per generation, so pages read
+    # through a cursor stay consistent. Returns (generation, proxies).
+    if not get_client():
+        return proxy_snapshot_generation(), []
+    try:
+        rows = cache.get('proxies', _load_proxy_rows)
+    except Exception as e:
+        print(f"Error fetching proxies: {e}")
+        return proxy_snapshot_generation(), []
+    global _snapshot
+    cache_generation = proxies_generation()
+    with _snapshot_lock:
+        if _snapshot[0] != cache_generation:
+            _, generation, proxies = _snapshot
+            ranked = rank_proxies(rows, len(rows), seed=0)
+            if ranked != proxies:
+                generation, proxies = generation + 1, ranked
+            _snapshot = (cache_generation, generation, proxies)
+        return _snapshot[1], _snapshot[2]
+
+def proxy_snapshot_generation():
+    # Changes whenever the list get_proxy_snapshot serves changes
+    return _snapshot[1]
+
+def mark_served(proxies):
+    with served_lock:
+        served.update(proxies)
+
+def warm_cache():
+    # Creates the client and loads the proxy pool; raises while Supabase is
+    # unreachable so readiness warm-up keeps retrying
+    if not get_client():
+        raise RuntimeError("Supabase client unavailable")
+    cache.get('proxies', _load_proxy_rows)
+
+def proxies_generation():
+    # Changes whenever the cached proxy set changes
+    return cache.generation('proxies')
+
 def get_configs(limit=5):
-    if not supabase:
+    if not get_client():
         return []
     try:
-        response = supabase.table('configs').select('*').limit(limit).execute()
-        configs = []
-        for row in response.data:
-            if 'config' in row and row['config']:
-                configs.append(row['config'])
-            elif 'url' in row and row['url']:
-                configs.append(row['url'])
-        return configs
+        return cache.get(('configs', limit), lambda: _load_configs(limit))
     except Exception as e:
         print(f"Error fetching configs: {e}")
-        return []
\ No newline at end of file
+        return []
+
+UPSERT_CHUNK_SIZE = int(os.environ.get("UPSERT_CHUNK_SIZE", 500))
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def upsert_rows(table, rows, link_column, chunk_size=UPSERT_CHUNK_SIZE):
+    # Upserts rows keyed by canonical endpoint in chunked batches and returns
+    # the number of rows written, or None if Supabase is unavailable or a
+    # request failed. Rows whose link cannot be parsed are skipped.
+    client = get_client()
+    if not client:
+        return None
+    from postgrest.types import ReturnMethod
+    now = datetime.now(timezone.utc).isoformat()
+    keyed = {}
+    for row in rows:
+        key = canonical_key(row[link_column])
+        if key is None:
+            continue
+        # A batch may not touch the same conflict key twice
+        keyed[key_string(key)] = dict(row, endpoint_key=key_string(key), updated_at=now)
+    batch = list(keyed.values())
+    written = 0
+    failed = False
+    try:
+        for chunk in _chunks(batch, chunk_size):
+            with SUPABASE_SECONDS.labels('upsert').time():
+                (
+                    client.table(table)
+                    .upsert(chunk, on_conflict='endpoint_key', returning=ReturnMethod.minimal)
+                    .execute()
+                )
+            written += len(chunk)
+    except Exception as e:
+        print(f"Error upserting into {table}: {e}")
+        failed = True
+    if written:
+        cache.expire()
+    return None if failed else written
+
+def upsert_proxies(rows):
+    return upsert_rows('proxies', rows, 'url')
+
+def upsert_configs(rows):
+    return upsert_rows('configs', rows, 'config')
+
+def delete_stale(table, max_age):
+    # Removes rows not refreshed within max_age (a timedelta) in one request
+    client = get_client()
+    if not client:
+        return
+    from postgrest.types import ReturnMethod
+    cutoff = (datetime.now(timezone.utc) - max_age).isoformat()
+    try:
+        with SUPABASE_SECONDS.labels('delete').time():
+            (
+                client.table(table)
+                .delete(returning=ReturnMethod.minimal)
+                .lt('updated_at', cutoff)
+                .execute()
+            )
+        cache.expire()
+    except Exception as e:
+        print(f"Error deleting stale rows from {table}: {e}")
+
+def take_served(limit):
+    # Most served links since the previous call; resets the counts
+    with served_lock:
+        top = [link for link, _ in served.most_common(limit)]
+        served.clear()
+    return top
+
+def load_revalidation_batch(table, link_column, limit, priority_links=()):
+    # Rows to re-probe: the given (most served) links first, then the rows
+    # verified longest ago
+    client = get_client()
+    if not client:
+        return []
+    columns = f'{link_column}, endpoint_key, fail_count, latency_ms'
+    rows = {}
+    try:
+        with SUPABASE_SECONDS.labels('select_revalidate').time():
+            if priority_links:
+                response = (
+                    client.table(table)
+                    .select(columns)
+                    .in_(link_column, list(priority_links))
+                    .execute()
+                )
+                rows.update((row['endpoint_key'], row) for row in response.data)
+            response = (
+                client.table(table)
+                .select(columns)
+                .order('last_checked', nullsfirst=True)
+                .limit(limit)
+                .execute()
+            )
+        for row in response.data:
+            if len(rows) >= limit:
+                break
+            rows.setdefault(row['endpoint_key'], row)
+    except Exception as e:
+        print(f"Error loading revalidation batch from {table}: {e}")
+    return list(rows.values())
+
+def save_probe_results(table, rows, chunk_size=UPSERT_CHUNK_SIZE):
+    # rows already carry endpoint_key; only the given columns are updated
+    client = get_client()
+    if not client or not rows:
+        return
+    from postgrest.types import ReturnMethod
+    written = 0
+    try:
+        for chunk in _chunks(rows, chunk_size):
+            with SUPABASE_SECONDS.labels('upsert').time():
+                (
+                    client.table(table)
+                    .upsert(chunk, on_conflict='endpoint_key', returning=ReturnMethod.minimal)
+                    .execute()
+                )
+            written += len(chunk)
+    except Exception as e:
+        print(f"Error saving probe results to {table}: {e}")
+    if written:
+        cache.expire()
+
+def delete_endpoints(table, endpoint_keys, chunk_size=UPSERT_CHUNK_SIZE):
+    client = get_client()
+    if not client or not endpoint_keys:
+        return
+    from postgrest.types import ReturnMethod
+    deleted = 0
+    try:
+        for chunk in _chunks(list(endpoint_keys), chunk_size):
+            with SUPABASE_SECONDS.labels('delete').time():
+                (
+                    client.table(table)
+                    .delete(returning=ReturnMethod.minimal)
+                    .in_('endpoint_key', chunk)
+                    .execute()
+                )
+            deleted += len(chunk)
+    except Exception as e:
+        print(f"Error deleting endpoints from {table}: {e}")
+    if deleted:
+        cache.expire()
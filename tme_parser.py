@@ -0,0 +1,75 @@
+import re
+import html
+from collections import namedtuple
+
+
+Message = namedtuple("Message", "id links codes")
+
+# One pass over the t.me/s widget markup. Only the tokens we care about are
+# matched: message boundaries, the start of the message's own text, links
+# and <code> bodies. No tree is built.
+TOKEN_RE = re.compile(
+    # The lookahead lets the scanner skip characters no alternative starts with
+    rb"(?=[<dc])(?:"
+    rb'data-post="[^"/]*/(?P<post>\d+)"'
+    # js-message_text only: a reply quote is tgme_widget_message_text too,
+    # but js-message_reply_text
+    rb'|(?P<text>class="tgme_widget_message_text[^"]*\bjs-message_text\b)'
+    rb'|<a\s[^>]*?href="(?P<href>[^"]*)"'
+    rb"|<code>(?P<code>.*?)</code>"
+    rb")",
+    re.S,
+)
+DIV_RE = re.compile(rb"<(/?)div\b")
+TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _text(raw):
+    value = raw.decode("utf-8", "replace")
+    if "<" in value:
+        value = TAG_RE.sub("", value)
+    return html.unescape(value).strip()
+
+
+def _div_end(content, start):
+    # Offset just past the </div> closing the div whose start tag is open at
+    # start, so links after the text (e.g. a link preview) are left out
+    depth = 1
+    for match in DIV_RE.finditer(content, start):
+        if match.group(1):
+            depth -= 1
+            if not depth:
+                return match.end()
+        else:
+            depth += 1
+    return len(content)
+
+
+def extract_messages(content, after_id=0):
+    # Returns Message(id, links, codes) for every post newer than after_id.
+    # Links are hrefs inside the message text; codes are <code> bodies.
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    messages = []
+    current = None
+    text_end = 0
+    for match in TOKEN_RE.finditer(content):
+        kind = match.lastgroup
+        if kind == "post":
+            message_id = int(match.group("post"))
+            text_end = 0
+            if message_id > after_id:
+                current = Message(message_id, [], [])
+                messages.append(current)
+            else:
+                current = None
+        elif current is None:
+            continue
+        elif kind == "text":
+            text_end = _div_end(content, match.end())
+        elif kind == "href":
+            if match.start() < text_end:
+                current.links.append(_text(match.group("href")))
+        elif kind == "code":
+            current.codes.append(_text(match.group("code")))
+    return messages
@@ -0,0 +1,197 @@
+import json
+import base64
+import ipaddress
+from urllib.parse import quote, unquote
+
+
+class InvalidLink(ValueError):
+    pass
+
+
+# Credentials compared case-insensitively (hex secrets and UUIDs)
+CASELESS_CREDENTIALS = ("mtproto", "vless", "vmess")
+
+
+class Endpoint:
+    # Parsed proxy/config link. credential is the MTProto secret, the vless or
+    # vmess UUID, the trojan password or the shadowsocks method:password, as
+    # written in the link.
+    __slots__ = ("protocol", "host", "port", "credential")
+
+    def __init__(self, protocol, host, port, credential):
+        self.protocol = protocol
+        self.host = host
+        self.port = port
+        self.credential = credential
+
+    def key(self):
+        # Identity of the endpoint, the same for links that differ only by
+        # remark, parameter order or letter case of a UUID/hex secret
+        credential = self.credential
+        if self.protocol in CASELESS_CREDENTIALS:
+            credential = credential.lower()
+        return (self.protocol, self.host, self.port, credential)
+
+    def address(self):
+        host = f"[{self.host}]" if ":" in self.host else self.host
+        return f"{host}:{self.port}"
+
+    def __eq__(self, other):
+        return isinstance(other, Endpoint) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"Endpoint({self.protocol}, {self.address()})"
+
+
+MTPROTO_HOSTS = ("t.me/proxy", "telegram.me/proxy", "www.t.me/proxy")
+
+
+def _b64decode(data):
+    data = data.strip().replace("-", "+").replace("_", "/")
+    try:
+        return base64.b64decode(data + "=" * (-len(data) % 4)).decode("utf-8")
+    except ValueError as e:
+        raise InvalidLink(f"bad base64 payload: {e}") from None
+
+
+def _host(host):
+    host = host.strip().lower().rstrip(".")
+    if host.startswith("[") and host.endswith("]"):
+        host = host[1:-1]
+    if not host or any(c in host for c in " /?#@[]"):
+        raise InvalidLink(f"bad host {host!r}")
+    if ":" in host:
+        try:
+            ipaddress.IPv6Address(host)
+        except ValueError:
+            raise InvalidLink(f"bad IPv6 address {host!r}") from None
+    return host
+
+
+def _port(port):
+    port = str(port).strip()
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise InvalidLink(f"bad port {port!r}")
+    return int(port)
+
+
+def _host_port(address):
+    # host:port or [ipv6]:port; anything after the authority is ignored
+    for separator in "/?#":
+        address = address.partition(separator)[0]
+    if address.startswith("["):
+        host, bracket, port = address[1:].partition("]")
+        if not bracket or not port.startswith(":"):
+            raise InvalidLink(f"bad address {address!r}")
+        return _host(host), _port(port[1:])
+    host, colon, port = address.rpartition(":")
+    if not colon:
+        raise InvalidLink(f"missing port in {address!r}")
+    if ":" in host:
+        raise InvalidLink(f"IPv6 address must be bracketed in {address!r}")
+    return _host(host), _port(port)
+
+
+def _query(query):
+    # First value of each parameter. Unlike parse_qs, "+" is kept as is:
+    # base64 MTProto secrets use it as a literal character.
+    params = {}
+    for pair in query.partition("#")[0].split("&"):
+        name, _, value = pair.partition("=")
+        if name and name not in params:
+            params[name] = unquote(value)
+    return params
+
+
+def _mtproto(rest):
+    params = _query(rest.partition("?")[2])
+    try:
+        server, port, secret = params["server"], params["port"], params["secret"]
+    except KeyError as e:
+        raise InvalidLink(f"missing MTProto parameter {e}") from None
+    if not secret:
+        raise InvalidLink("empty MTProto secret")
+    return Endpoint("mtproto", _host(server), _port(port), secret.strip())
+
+
+def _vmess(rest):
+    try:
+        config = json.loads(_b64decode(rest.partition("#")[0]))
+        host, port, uuid = config["add"], config["port"], config["id"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidLink(f"bad vmess payload: {e}") from None
+    return Endpoint("vmess", _host(str(host)), _port(port), str(uuid))
+
+
+def _ss(rest):
+    rest = rest.partition("#")[0]
+    authority = rest.partition("?")[0].partition("/")[0]
+    if "@" in authority:
+        userinfo, _, address = authority.rpartition("@")
+        userinfo = unquote(userinfo)
+        if ":" not in userinfo:
+            userinfo = _b64decode(userinfo)
+    else:
+        # Legacy form: the whole method:password@host:port is base64 encoded
+        userinfo, at, address = _b64decode(authority).rpartition("@")
+        if not at:
+            raise InvalidLink("missing ss server")
+    if ":" not in userinfo:
+        raise InvalidLink("ss userinfo is not method:password")
+    host, port = _host_port(address)
+    return Endpoint("ss", host, port, userinfo)
+
+
+def _userinfo_link(scheme, rest):
+    authority = rest
+    for separator in "/?#":
+        authority = authority.partition(separator)[0]
+    userinfo, at, address = authority.rpartition("@")
+    if not at or not userinfo:
+        raise InvalidLink(f"missing {scheme} credential")
+    host, port = _host_port(address)
+    return Endpoint(scheme, host, port, unquote(userinfo))
+
+
+def parse(link):
+    # Parses tg://proxy, https://t.me/proxy, vless, vmess, ss and trojan links
+    # into an Endpoint. Raises InvalidLink for anything else or for links
+    # missing a usable host, port or credential.
+    if not isinstance(link, str):
+        raise InvalidLink(f"not a link: {link!r}")
+    scheme, separator, rest = link.strip().partition("://")
+    if not separator:
+        raise InvalidLink(f"missing scheme in {link[:40]!r}")
+    scheme = scheme.lower()
+    if scheme == "tg":
+        if not rest.lower().startswith("proxy?"):
+            raise InvalidLink("tg link is not a proxy")
+        return _mtproto(rest)
+    if scheme in ("https", "http"):
+        if not rest.lower().startswith(MTPROTO_HOSTS):
+            raise InvalidLink("https link is not a t.me proxy")
+        return _mtproto(rest)
+    if scheme == "vmess":
+        return _vmess(rest)
+    if scheme == "ss":
+        return _ss(rest)
+    if scheme in ("vless", "trojan"):
+        return _userinfo_link(scheme, rest)
+    raise InvalidLink(f"unsupported scheme {scheme!r}")
+
+
+def try_parse(link):
+    try:
+        return parse(link)
+    except InvalidLink:
+        return None
+
+
+def mtproto_link(endpoint):
+    # Normalized tg:// link for an MTProto endpoint; the secret is
+    # percent-encoded so base64 secrets survive ("+", "/", "=")
+    secret = quote(endpoint.credential, safe="")
+    return f"tg://proxy?server={endpoint.host}&port={endpoint.port}&secret={secret}"
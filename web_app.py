@@ -1,11 +1,35 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 import threading
+import hmac
+import json
+import base64
+import logging
 import os
-from bot import bot, scheduler, send_updates, get_proxies
-from supabase_db import get_proxies as db_get_proxies
+import metrics
+import readiness
+from dotenv import load_dotenv # type: ignore
+from supabase_db import get_proxy_snapshot, proxy_snapshot_generation, mark_served
+from render_cache import RenderCache
+from http_cache import EncodedBody, etag_matches
+
+# bot is imported on first use (or by the bot thread) so the port is bound
+# before the TeleBot and its dependencies are loaded
+load_dotenv()
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")
 
 app = Flask(__name__)
 
+# Required in the X-Admin-Token header for /logs; the endpoint is off without it
+ADMIN_API_TOKEN = os.environ.get('ADMIN_API_TOKEN')
+
+# Production server settings (waitress); Flask's threaded server is the
+# fallback when waitress is not installed
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 32))
+WEB_CONNECTION_LIMIT = int(os.environ.get('WEB_CONNECTION_LIMIT', 1000))
+
+MAX_PAGE_SIZE = 50
+
 # Bot status tracking
 bot_status = {"running": False, "scheduler": False}
 
@@ -22,33 +46,136 @@ def home():
 def health():
     return jsonify({"status": "healthy"})
 
+@app.route('/livez')
+def livez():
+    # The process is up and serving; says nothing about dependencies
+    return jsonify({"status": "alive"})
+
+@app.route('/readyz')
+def readyz():
+    # 503 until warm-up has connected to Supabase, primed the proxy cache
+    # and the bot is receiving updates
+    ready = readiness.is_ready()
+    body = {"status": "ready" if ready else "warming", "components": readiness.status()}
+    return jsonify(body), 200 if ready else 503
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/metrics/pipeline')
+def pipeline_metrics_endpoint():
+    # Last export of the collection job, when it runs on this host
+    body = metrics.read_textfile(metrics.PIPELINE_METRICS_FILE)
+    if body is None:
+        return Response("", status=404, content_type=metrics.CONTENT_TYPE)
+    return Response(body, content_type=metrics.CONTENT_TYPE)
+
 @app.route('/api/status')
 def api_status():
     return jsonify(bot_status)
 
+def encode_cursor(generation, offset):
+    raw = f"{generation}.{offset}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    generation, offset = raw.split(".")
+    return int(generation), int(offset)
+
+# Serialized and compressed pages of the current proxy generation; a poll
+# that finds nothing new is answered from here with a 304
+proxy_pages = RenderCache(proxy_snapshot_generation)
+
+def render_proxy_page(proxies, generation, offset, count):
+    page = proxies[offset:offset + count]
+    end = offset + len(page)
+    body = {
+        "proxies": page,
+        "count": len(page),
+        "next_cursor": encode_cursor(generation, end) if end < len(proxies) else None,
+    }
+    return EncodedBody(json.dumps(body, separators=(",", ":")).encode()), page
+
 @app.route('/api/proxies')
 def api_proxies():
     try:
-        count = request.args.get('count', 10, type=int)
-        proxies = db_get_proxies(min(count, 50))
-        return jsonify({"proxies": proxies, "count": len(proxies)})
+        count = min(max(request.args.get('count', 10, type=int), 1), MAX_PAGE_SIZE)
+        generation, proxies = get_proxy_snapshot()
+        offset = 0
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                cursor_generation, offset = decode_cursor(cursor)
+            except (ValueError, UnicodeDecodeError):
+                return jsonify({"error": "invalid cursor"}), 400
+            if cursor_generation != generation or offset < 0:
+                # The proxy set changed since the first page; start over
+                return jsonify({"error": "cursor expired"}), 410
+
+        encoded, page = proxy_pages.get(
+            (generation, offset, count),
+            lambda: render_proxy_page(proxies, generation, offset, count),
+        )
+        encoding, body, etag = encoded.select(request.headers.get('Accept-Encoding'))
+        headers = {
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': 'no-cache',
+        }
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return Response(status=304, headers=headers)
+        mark_served(page)
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(body, content_type='application/json', headers=headers)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/logs')
+def api_logs():
+    token = request.headers.get('X-Admin-Token', '')
+    if not ADMIN_API_TOKEN or not hmac.compare_digest(token, ADMIN_API_TOKEN):
+        return jsonify({"error": "forbidden"}), 403
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    level = logging.getLevelName(request.args.get('level', 'NOTSET').upper())
+    if not isinstance(level, int):
+        return jsonify({"error": "invalid level"}), 400
+    from bot import recent_logs
+    lines = recent_logs(limit, level)
+    return jsonify({"logs": lines, "count": len(lines)})
+
 @app.route('/api/send-update', methods=['POST'])
 def api_send_update():
     try:
+        from bot import send_updates
         send_updates()
         return jsonify({"message": "Update sent successfully"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route(WEBHOOK_PATH, methods=['POST'])
+def telegram_webhook():
+    token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+    if not WEBHOOK_SECRET or not hmac.compare_digest(token, WEBHOOK_SECRET):
+        return jsonify({"error": "forbidden"}), 403
+    from telebot import types # type: ignore
+    from bot import bot
+    try:
+        update = types.Update.de_json(request.get_data(as_text=True))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    # Handlers run on the bot's worker pool, so this returns immediately
+    bot.process_new_updates([update])
+    return '', 200
+
 def start_bot():
     global bot_status
     try:
         from bot import main as bot_main
         bot_status["running"] = True
-        bot_main()
+        bot_main(serve_webhook=True)
     except Exception as e:
         print(f"Bot error: {e}")
         bot_status["running"] = False
@@ -58,6 +185,12 @@ if __name__ == '__main__':
     bot_thread = threading.Thread(target=start_bot, daemon=True)
     bot_thread.start()
     
-    # Start Flask app
     port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
+    try:
+        from waitress import serve # type: ignore
+    except ImportError:
+        print("waitress not installed, using Flask's threaded server")
+        app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
+    else:
+        serve(app, host='0.0.0.0', port=port, threads=WEB_THREADS,
+              connection_limit=WEB_CONNECTION_LIMIT, ident=None)
\ No newline at end of file